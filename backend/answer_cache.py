@@ -0,0 +1,102 @@
+"""
+This file implements the semantic answer cache for general questions in the chat.
+
+Answers to questions like "what is GOPHORA?" only depend on the question and on the
+knowledge base documents (`context.WEBSITE_CONTEXT` and anything in KB_DOCS_DIR), so
+once Gemini has answered a question we store the answer together with the question's
+embedding. A later question whose embedding is close enough (cosine similarity >=
+ANSWER_CACHE_MIN_SIMILARITY) gets the stored answer back without a generation call.
+
+Every entry records the hash of the documents it was generated from, and lookups only
+consider entries for the current hash, so editing the context invalidates the cache
+on the next deploy without any manual step.
+
+Answers expire after ANSWER_CACHE_TTL_SECONDS, and at most ANSWER_CACHE_MAX_ENTRIES are
+kept (the oldest go first); every store prunes the table. The lookup is served by an
+HNSW index on the embedding (migration 0006), so it doesn't scan the table.
+"""
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import knowledge_base, models
+from .config import ANSWER_CACHE_ENABLED, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_MIN_SIMILARITY, ANSWER_CACHE_TTL_SECONDS
+
+CONTEXT_HASH = knowledge_base.corpus_hash()
+
+stats = {"hits": 0, "misses": 0, "stores": 0, "pruned": 0}
+
+
+def _expired():
+    return models.AnswerCache.created_at < func.now() - timedelta(seconds=ANSWER_CACHE_TTL_SECONDS)
+
+
+async def lookup(db: AsyncSession, embedding: Optional[list[float]]) -> Optional[str]:
+    """Returns a stored answer for a semantically equivalent question, if there is one."""
+    if not ANSWER_CACHE_ENABLED or not embedding:
+        return None
+    distance = models.AnswerCache.embedding.cosine_distance(embedding)
+    try:
+        row = (await db.execute(
+            select(models.AnswerCache.answer, distance.label("distance"))
+            .filter(models.AnswerCache.context_hash == CONTEXT_HASH, ~_expired())
+            .order_by(distance)
+            .limit(1)
+        )).first()
+    except Exception as e:
+        print(f"Answer cache lookup failed: {e}")
+        await db.rollback()
+        return None
+
+    # cosine distance = 1 - cosine similarity
+    if row is not None and 1 - row.distance >= ANSWER_CACHE_MIN_SIMILARITY:
+        stats["hits"] += 1
+        return row.answer
+    stats["misses"] += 1
+    return None
+
+
+async def store(db: AsyncSession, question: str, embedding: Optional[list[float]], answer: str):
+    if not ANSWER_CACHE_ENABLED or not embedding or not answer:
+        return
+    try:
+        db.add(models.AnswerCache(
+            question=question,
+            answer=answer,
+            context_hash=CONTEXT_HASH,
+            embedding=embedding,
+        ))
+        await db.commit()
+        stats["stores"] += 1
+        stats["pruned"] += await prune(db)
+    except Exception as e:
+        print(f"Answer cache store failed: {e}")
+        await db.rollback()
+
+
+async def prune(db: AsyncSession) -> int:
+    """Deletes expired answers and the oldest ones beyond ANSWER_CACHE_MAX_ENTRIES."""
+    # id of the newest row that no longer fits (ids only grow, so newest = highest)
+    newest_dropped = (
+        select(models.AnswerCache.id)
+        .order_by(models.AnswerCache.id.desc())
+        .offset(ANSWER_CACHE_MAX_ENTRIES)
+        .limit(1)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        delete(models.AnswerCache).where(or_(_expired(), models.AnswerCache.id <= newest_dropped))
+    )
+    await db.commit()
+    return result.rowcount or 0
+
+
+async def purge_stale(db: AsyncSession) -> int:
+    """Deletes answers generated from an older version of the context, and expired ones."""
+    result = await db.execute(
+        delete(models.AnswerCache).where(models.AnswerCache.context_hash != CONTEXT_HASH)
+    )
+    await db.commit()
+    return (result.rowcount or 0) + await prune(db)
@@ -1,71 +1,132 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+import hmac
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 
-from . import models, schemas
-from .database import SessionLocal
-from .config import SECRET_KEY, ALGORITHM
-
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+from . import models, password_hashing, schemas
+from .database import get_db
+from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, ADMIN_API_TOKEN
+from .config import AUTH_PRINCIPAL_CACHE_MAX_ENTRIES, AUTH_PRINCIPAL_CACHE_TTL_SECONDS
+from .principal_cache import PrincipalCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Argon2 itself runs on a bounded pool of its own (see password_hashing.py)
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_hashing.hash_password(password)
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hashing.verify_password(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+        expire = now + timedelta(minutes=15)
+    # iat lets a role change or deletion revoke the tokens issued before it (see principal_cache.py)
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def user_token_claims(user: models.User) -> dict:
+    """What an access token says about its user: email (sub), role and id (uid)."""
+    return {"sub": user.email, "role": user.role, "uid": user.id}
 
 def get_user(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+# Resolved users by id, shared by every request this worker serves
+principal_cache = PrincipalCache(
+    max_entries=AUTH_PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+    revocation_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+def invalidate_principal(user_id: int, revoke_tokens: bool = False):
+    """Drops the cached user; `revoke_tokens` when the role changed or the user is gone."""
+    principal_cache.invalidate(user_id, revoke_tokens=revoke_tokens)
+
+@event.listens_for(models.User, "after_update")
+def _user_updated(mapper, connection, target):
+    invalidate_principal(target.id, revoke_tokens=inspect(target).attrs.role.history.has_changes())
+
+@event.listens_for(models.User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    invalidate_principal(target.id, revoke_tokens=True)
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        role: str = payload.get("role")
-        if email is None or role is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    if payload.get("sub") is None or payload.get("role") is None:
+        raise _credentials_exception()
+    return payload
 
-    user = get_user(db, email=email)
+def _load_user(db: Session, payload: dict) -> schemas.User:
+    """The token's user from the database (by id; by email for tokens from before uid), cached."""
+    user_id = payload.get("uid")
+    user = db.get(models.User, user_id) if user_id is not None else get_user(db, email=payload["sub"])
     if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+    # A detached snapshot, so it can outlive the session it was loaded in
+    snapshot = schemas.User.model_validate(user)
+    principal_cache.set(user.id, snapshot)
+    return snapshot
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """The whole user behind the token: from the cache, or one query by id on a miss."""
+    payload = _decode_token(token)
+    user_id = payload.get("uid")
+    if user_id is not None:
+        cached = principal_cache.get(user_id)
+        if cached is not None:
+            return cached
+    return _load_user(db, payload)
 
-async def get_current_active_seeker(current_user: models.User = Depends(get_current_user)):
+def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> schemas.Principal:
+    """
+    The id and role behind the token, without a query: the token is signed, so its claims
+    are trusted unless this worker has seen the user's role change (or the user deleted)
+    since the token was issued. Only those tokens, and old tokens without a uid, are
+    checked against the database.
+    """
+    payload = _decode_token(token)
+    user_id = payload.get("uid")
+    if user_id is not None:
+        cached = principal_cache.get(user_id)
+        if cached is not None:
+            return cached
+        if not principal_cache.is_revoked(user_id, payload.get("iat")):
+            return schemas.Principal(id=user_id, email=payload["sub"], role=payload["role"])
+    return _load_user(db, payload)
+
+async def get_current_active_seeker(current_user: schemas.Principal = Depends(get_current_principal)):
     if current_user.role != "seeker":
         raise HTTPException(status_code=403, detail="Not authorized: Requires seeker role")
     return current_user
 
-def get_current_active_provider(current_user: models.User = Depends(get_current_user)):
+def get_current_active_provider(current_user: schemas.Principal = Depends(get_current_principal)):
     if current_user.role != "provider":
         raise HTTPException(status_code=403, detail="Not a provider")
     return current_user
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guards the /api/admin routes: X-Admin-Token must match ADMIN_API_TOKEN (unset: all refused)."""
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin API is disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_API_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token")
@@ -0,0 +1,152 @@
+"""
+This file implements the embedding backfill for opportunities.
+
+`create_opportunity` stores a NULL embedding whenever Gemini is down or not configured,
+and those rows are invisible to (or randomly ordered in) every vector search. The
+backfill walks the NULL rows in id order, embeds a whole batch per Gemini request,
+commits per batch and records the last id it finished in `job_checkpoints`, so an
+interrupted run picks up where it stopped.
+
+A batch that still fails after MAX_BATCH_ATTEMPTS is logged and skipped, so one bad row
+can't stall the whole backfill; its ids are reported in `failed_ids` and, since they
+keep their NULL embedding, the next pass over the table tries them again. After
+MAX_CONSECUTIVE_FAILURES skipped batches in a row Gemini itself is presumably down, and
+the run stops before the batch it could not embed.
+
+Run it from the command line:
+    python -m backend.backfill --batch-size 100
+or through POST /api/admin/backfill-embeddings.
+"""
+import argparse
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from . import models
+
+CHECKPOINT_NAME = "opportunity_embeddings"
+# Gemini's batchEmbedContents accepts at most 100 texts per request
+MAX_BATCH_SIZE = 100
+MAX_BATCH_ATTEMPTS = 3
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+def opportunity_embedding_text(title: str, description: str, tags: Optional[list[str]]) -> str:
+    """The text an opportunity's embedding is computed from."""
+    return f"Title: {title}\nDescription: {description}\nTags: {', '.join(tags or [])}"
+
+
+def _load_checkpoint(db: Session) -> models.JobCheckpoint:
+    checkpoint = db.get(models.JobCheckpoint, CHECKPOINT_NAME)
+    if checkpoint is None:
+        checkpoint = models.JobCheckpoint(name=CHECKPOINT_NAME, last_id=0)
+        db.add(checkpoint)
+        db.commit()
+    return checkpoint
+
+
+def backfill_opportunity_embeddings(
+    db: Session,
+    embed_texts: Callable[[list[str]], Optional[list[list[float]]]],
+    batch_size: int = MAX_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    restart: bool = False,
+) -> dict:
+    """Embeds opportunities whose embedding is NULL, one batch per Gemini request.
+
+    Resumes after the checkpointed id unless `restart` is set. `max_batches` bounds the
+    work done in one call (useful from the HTTP endpoint). The checkpoint is reset once
+    the end of the table is reached, so the next run also sees rows created since.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    checkpoint = _load_checkpoint(db)
+    if restart:
+        checkpoint.last_id = 0
+        db.commit()
+
+    started = time.perf_counter()
+    embedded = 0
+    batches = 0
+    finished = False
+    failed = False
+    failed_ids: list[int] = []
+    consecutive_failures = 0
+
+    while max_batches is None or batches < max_batches:
+        # Keyset pagination: only the columns needed to build the text, never OFFSET
+        rows = db.query(
+            models.Opportunity.id,
+            models.Opportunity.title,
+            models.Opportunity.description,
+            models.Opportunity.tags,
+        ).filter(
+            models.Opportunity.embedding == None,
+            models.Opportunity.id > checkpoint.last_id,
+        ).order_by(models.Opportunity.id).limit(batch_size).all()
+
+        if not rows:
+            finished = True
+            break
+
+        texts = [opportunity_embedding_text(r.title, r.description, r.tags) for r in rows]
+        vectors = None
+        for _ in range(MAX_BATCH_ATTEMPTS):
+            vectors = embed_texts(texts)
+            if vectors:
+                break
+
+        if vectors:
+            db.execute(
+                update(models.Opportunity),
+                [{"id": r.id, "embedding": vector} for r, vector in zip(rows, vectors)],
+            )
+            embedded += len(rows)
+            consecutive_failures = 0
+        else:
+            consecutive_failures += 1
+            if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                # Leave the checkpoint before this batch so the next run retries it
+                failed = True
+                break
+            batch_ids = [r.id for r in rows]
+            print(f"Backfill: skipping ids {batch_ids[0]}..{batch_ids[-1]} after {MAX_BATCH_ATTEMPTS} failed attempts")
+            failed_ids.extend(batch_ids)
+
+        checkpoint.last_id = rows[-1].id
+        db.commit()
+        batches += 1
+
+    if finished:
+        checkpoint.last_id = 0
+        db.commit()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "embedded": embedded,
+        "batches": batches,
+        "finished": finished,
+        "failed": failed,
+        "failed_ids": failed_ids,
+        "resume_after_id": checkpoint.last_id,
+        "elapsed_seconds": round(elapsed, 2),
+        "rows_per_second": round(embedded / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embed opportunities that have no embedding yet.")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None)
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+    from .main import embed_texts
+
+    with SessionLocal() as session:
+        print(backfill_opportunity_embeddings(
+            session, embed_texts,
+            batch_size=args.batch_size, max_batches=args.max_batches, restart=args.restart,
+        ))
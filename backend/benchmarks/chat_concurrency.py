@@ -0,0 +1,102 @@
+"""
+Benchmark: throughput of /api/chat at high concurrency against a stubbed Gemini.
+
+Gemini is replaced by a fake that sleeps for --latency seconds per call, so the
+numbers measure how many LLM waits the server can overlap, not Gemini itself.
+The async /api/chat endpoint is compared with a sync `def` endpoint doing the same
+blocking call, which is how handle_chat used to run (FastAPI's 40-thread pool).
+
+Usage (from the repository root, with DATABASE_URL set as for the app):
+    python -m backend.benchmarks.chat_concurrency --requests 200 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import google.generativeai as genai
+import httpx
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("GEMINI_EMBED_MODEL", "models/text-embedding-004")
+# Measure generation, not answer reuse
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+
+LATENCY = 0.5
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _FakeModel:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def generate_content(self, *args, **kwargs):
+        time.sleep(LATENCY)
+        return _FakeResponse("GOPHORA is an AI-powered human opportunity platform.")
+
+    async def generate_content_async(self, *args, **kwargs):
+        await asyncio.sleep(LATENCY)
+        return _FakeResponse("GOPHORA is an AI-powered human opportunity platform.")
+
+
+async def _fake_embed_content_async(*args, **kwargs):
+    await asyncio.sleep(LATENCY)
+    return {"embedding": [0.0] * 768}
+
+
+def _install_stubs():
+    genai.GenerativeModel = _FakeModel
+    genai.embed_content_async = _fake_embed_content_async
+
+
+async def _fire(client: httpx.AsyncClient, path: str, total: int) -> dict:
+    latencies = []
+
+    async def one():
+        started = time.perf_counter()
+        response = await client.post(path, json={"message": "What is GOPHORA?"})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": total,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_s": round(statistics.median(latencies), 2),
+        "p95_s": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+    }
+
+
+async def run(total: int):
+    _install_stubs()
+    from backend import main
+
+    @main.app.post("/bench/sync-chat")
+    def sync_chat(chat_request: main.schemas.ChatRequest):
+        # Same blocking call shape as the old sync handle_chat
+        model = genai.GenerativeModel(main.GEMINI_CHAT_MODEL_NAME)
+        return {"reply": model.generate_content(chat_request.message).text, "opportunities": []}
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for label, path in (("sync (threadpool)", "/bench/sync-chat"), ("async /api/chat", "/api/chat")):
+            result = await _fire(client, path, total)
+            print(f"{label:20s} {result}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="stubbed Gemini latency in seconds")
+    args = parser.parse_args()
+    LATENCY = args.latency
+    asyncio.run(run(args.requests))
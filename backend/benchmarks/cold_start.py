@@ -0,0 +1,111 @@
+"""
+Benchmark: worker cold start.
+
+Measures, in fresh processes:
+  - import: time to `import backend.main` (module-level work only)
+  - live:   time from spawning uvicorn to the first 200 from /api/health/live,
+            i.e. how long an autoscaled worker takes to accept traffic
+  - ready:  time to the first 200 from /api/health/ready (database reachable and
+            migrated); only meaningful against a migrated DATABASE_URL
+
+and fails (exit status 1) if the median `live` time is above --target-seconds.
+Importing the app must not connect to the database, so `import` and `live` do not
+depend on how fast (or whether) the database answers.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.cold_start --runs 5 --target-seconds 2.0
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import backend.main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_boot(timeout: float = 30.0) -> tuple[float, float | None]:
+    """Returns (seconds until live, seconds until ready or None)."""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    live = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while time.perf_counter() - started < timeout and ready is None:
+                path = "/api/health/live" if live is None else "/api/health/ready"
+                try:
+                    if client.get(path).status_code == 200:
+                        elapsed = time.perf_counter() - started
+                        if live is None:
+                            live = elapsed
+                        else:
+                            ready = elapsed
+                        continue
+                except httpx.TransportError:
+                    pass
+                if live is not None and time.perf_counter() - started > live + 5:
+                    break  # live but not ready: database missing or not migrated
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    if live is None:
+        raise RuntimeError("uvicorn did not become live")
+    return live, ready
+
+
+def _summary(values) -> str:
+    values = [v for v in values if v is not None]
+    if not values:
+        return "n/a"
+    return f"median={statistics.median(values):.3f}s max={max(values):.3f}s"
+
+
+def main(runs: int, target_seconds: float) -> int:
+    imports = [measure_import() for _ in range(runs)]
+    boots = [measure_boot() for _ in range(runs)]
+    live = [b[0] for b in boots]
+    ready = [b[1] for b in boots]
+
+    print(f"import  {_summary(imports)}")
+    print(f"live    {_summary(live)}")
+    print(f"ready   {_summary(ready)}")
+    median_live = statistics.median(live)
+    verdict = "OK" if median_live <= target_seconds else "OVER TARGET"
+    print(f"target  live median <= {target_seconds:.2f}s: {verdict}")
+    return 0 if median_live <= target_seconds else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker cold start time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--target-seconds", type=float, default=float(os.getenv("COLD_START_TARGET_SECONDS", "2.0"))
+    )
+    args = parser.parse_args()
+    sys.exit(main(args.runs, args.target_seconds))
@@ -0,0 +1,103 @@
+"""
+Benchmark: extracting the verification summary (first 500 characters of text) from HTML.
+
+Compares, page by page, the BeautifulSoup version scraping used to have (whole tree,
+then every text node) with `scraping.extract_page_text` (incremental tokenizer, no
+tree, stops once it has 500 characters), and reports the median time and the peak
+memory allocated for each, and whether both give the same summary.
+
+Pages are local files and/or URLs (downloaded once, before timing). Without either,
+a synthetic 5 MB page is used: a large inline script, navigation, then paragraphs.
+Like the app, it needs DATABASE_URL set (importing scraping imports the models).
+
+Usage (from the repository root):
+    python -m backend.benchmarks.html_extraction --url https://example.com --file saved_page.html --runs 20
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+import httpx
+from bs4 import BeautifulSoup
+
+from ..scraping import HEADERS, extract_page_text
+
+
+def extract_with_beautifulsoup(html: str) -> str:
+    """scraping.extract_page_text before the streaming extractor, kept as the baseline."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for script_or_style in soup(["script", "style"]):
+        script_or_style.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+    return text[:500] + "..." if len(text) > 500 else text
+
+
+def synthetic_page(size_bytes: int) -> str:
+    parts = [
+        "<!DOCTYPE html><html><head><title>Acme Robotics &mdash; Careers</title>",
+        "<script>window.__STATE__ = " + '{"k": "' + "x" * (size_bytes // 5) + '"};</script>',
+        "<style>" + ".c{color:red}\n" * 2000 + "</style></head><body>",
+        "<nav><ul>" + "".join(f"<li><a href='/p{i}'>Page {i}</a></li>" for i in range(200)) + "</ul></nav>",
+    ]
+    paragraph = "<div class='card'><h2>Opening</h2><p>We build   robots &amp; tools for <b>everyone</b>.</p></div>\n"
+    parts.append(paragraph * ((size_bytes - sum(map(len, parts))) // len(paragraph)))
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def measure(extract, html: str, runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        summary = extract(html)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    extract(html)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "ms_p50": round(statistics.median(timings) * 1000, 2),
+        "peak_mib": round(peak / 2**20, 2),
+        "summary": summary,
+    }
+
+
+def main(urls: list[str], files: list[str], runs: int, synthetic_bytes: int):
+    pages = []
+    for url in urls:
+        response = httpx.get(url, headers=HEADERS, follow_redirects=True, timeout=30)
+        response.raise_for_status()
+        pages.append((url, response.text))
+    for path in files:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append((path, f.read()))
+    if not pages:
+        pages.append((f"synthetic {synthetic_bytes // 2**20} MB page", synthetic_page(synthetic_bytes)))
+
+    for name, html in pages:
+        before = measure(extract_with_beautifulsoup, html, runs)
+        after = measure(extract_page_text, html, runs)
+        print({
+            "page": name,
+            "kib": len(html.encode("utf-8", errors="replace")) // 1024,
+            "beautifulsoup_ms": before["ms_p50"],
+            "streaming_ms": after["ms_p50"],
+            "speedup": round(before["ms_p50"] / after["ms_p50"], 1) if after["ms_p50"] else None,
+            "beautifulsoup_peak_mib": before["peak_mib"],
+            "streaming_peak_mib": after["peak_mib"],
+            "same_summary": before["summary"] == after["summary"],
+        })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verification page text extraction, BeautifulSoup vs streaming")
+    parser.add_argument("--url", action="append", default=[], help="page to download and benchmark (repeatable)")
+    parser.add_argument("--file", action="append", default=[], help="saved HTML file to benchmark (repeatable)")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--synthetic-bytes", type=int, default=5 * 2**20)
+    args = parser.parse_args()
+    main(args.url, args.file, args.runs, args.synthetic_bytes)
@@ -0,0 +1,74 @@
+"""
+Benchmark: login (Argon2 verify) throughput per core on the password pool.
+
+Verifies --logins passwords concurrently through a PasswordHashPool with 1, 2, ... up
+to --max-workers threads and reports logins/second in total and per worker thread
+(i.e. per core while workers <= cores). While each burst runs, a probe measures how
+late the event loop wakes up, which is what every other endpoint would feel.
+
+Argon2 costs default to the ARGON2_* settings; override them to size new parameters:
+    python -m backend.benchmarks.password_hashing --logins 200 --time-cost 2 --memory-cost-kib 32768
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from passlib.context import CryptContext
+
+from ..config import ARGON2_MEMORY_COST_KIB, ARGON2_PARALLELISM, ARGON2_TIME_COST
+from ..password_hashing import PasswordHashPool
+
+
+async def _loop_lag(stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        samples.append(time.perf_counter() - started - 0.005)
+
+
+async def run_burst(context: CryptContext, hashed: str, workers: int, logins: int) -> dict:
+    pool = PasswordHashPool(workers=workers, max_queue=logins)
+    stop, lag = asyncio.Event(), []
+    probe = asyncio.create_task(_loop_lag(stop, lag))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(pool.run_async(context.verify, "benchmark-password", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    assert all(results)
+    rate = logins / elapsed
+    return {
+        "workers": workers,
+        "logins_per_second": round(rate, 1),
+        "per_worker": round(rate / workers, 1),
+        "hash_ms_mean": pool.stats()["hash_ms_mean"],
+        "loop_lag_ms_p50": round(statistics.median(lag) * 1000, 2) if lag else None,
+    }
+
+
+async def main(logins: int, max_workers: int, time_cost: int, memory_cost_kib: int, parallelism: int):
+    context = CryptContext(
+        schemes=["argon2"],
+        argon2__rounds=time_cost,
+        argon2__memory_cost=memory_cost_kib,
+        argon2__parallelism=parallelism,
+    )
+    hashed = context.hash("benchmark-password")
+    print(f"argon2 t={time_cost} m={memory_cost_kib}KiB p={parallelism}, {logins} logins, {os.cpu_count()} cores")
+    workers = 1
+    while workers <= max_workers:
+        print(await run_burst(context, hashed, workers, logins))
+        workers *= 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Argon2 login throughput per core")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--time-cost", type=int, default=ARGON2_TIME_COST)
+    parser.add_argument("--memory-cost-kib", type=int, default=ARGON2_MEMORY_COST_KIB)
+    parser.add_argument("--parallelism", type=int, default=ARGON2_PARALLELISM)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.max_workers, args.time_cost, args.memory_cost_kib, args.parallelism))
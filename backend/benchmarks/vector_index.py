@@ -0,0 +1,116 @@
+"""
+Benchmark: recall@k and latency of the HNSW index against the exact scan.
+
+Loads --rows synthetic 768-d vectors (clustered, which is closer to real text
+embeddings than uniform noise) into a scratch table, answers --queries nearest
+neighbour queries with a sequential scan to get the ground truth, builds the same
+HNSW index the app uses, and repeats the queries for several hnsw.ef_search values.
+
+Usage (from the repository root, against a pgvector-enabled DATABASE_URL):
+    python -m backend.benchmarks.vector_index --rows 100000 --queries 100 --k 10
+"""
+import argparse
+import io
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from backend.config import HNSW_M, HNSW_EF_CONSTRUCTION
+from backend.database import engine
+
+TABLE = "bench_vectors"
+DIM = 768
+
+
+def _unit(vector):
+    norm = sum(x * x for x in vector) ** 0.5 or 1.0
+    return [x / norm for x in vector]
+
+
+def _make_centers(clusters: int, rng: random.Random):
+    return [[rng.gauss(0, 1) for _ in range(DIM)] for _ in range(clusters)]
+
+
+def _make_vectors(count: int, centers, rng: random.Random):
+    for _ in range(count):
+        center = rng.choice(centers)
+        yield _unit([c + rng.gauss(0, 0.6) for c in center])
+
+
+def _literal(vector) -> str:
+    return "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+
+
+def _load(connection, rows: int, centers, rng: random.Random):
+    connection.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    connection.execute(text(f"CREATE TABLE {TABLE} (id serial PRIMARY KEY, embedding vector({DIM}))"))
+    raw = connection.connection.dbapi_connection
+    buffer = io.StringIO()
+    for vector in _make_vectors(rows, centers, rng):
+        buffer.write(_literal(vector) + "\n")
+    buffer.seek(0)
+    with raw.cursor() as cursor:
+        cursor.copy_expert(f"COPY {TABLE} (embedding) FROM STDIN", buffer)
+    connection.execute(text(f"ANALYZE {TABLE}"))
+
+
+def _run(connection, queries, k: int):
+    results, latencies = [], []
+    statement = text(f"SELECT id FROM {TABLE} ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k")
+    for query in queries:
+        started = time.perf_counter()
+        ids = connection.execute(statement, {"q": query, "k": k}).scalars().all()
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append(set(ids))
+    latencies.sort()
+    return results, {
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "p95_ms": round(latencies[max(0, int(len(latencies) * 0.95) - 1)], 2),
+    }
+
+
+def main(rows: int, queries: int, k: int, clusters: int, ef_values, seed: int):
+    rng = random.Random(seed)
+    centers = _make_centers(clusters, rng)
+    # Queries come from the same clusters as the data, but are not rows of the table
+    query_vectors = [_literal(v) for v in _make_vectors(queries, centers, random.Random(seed + 1))]
+
+    with engine.connect() as connection:
+        print(f"Loading {rows} vectors into {TABLE}...")
+        _load(connection, rows, centers, rng)
+        connection.commit()
+
+        exact, exact_latency = _run(connection, query_vectors, k)
+        print(f"exact scan          {exact_latency}")
+
+        started = time.perf_counter()
+        connection.execute(text(
+            f"CREATE INDEX ON {TABLE} USING hnsw (embedding vector_cosine_ops) "
+            f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+        ))
+        connection.commit()
+        print(f"hnsw build          m={HNSW_M} ef_construction={HNSW_EF_CONSTRUCTION} "
+              f"took {time.perf_counter() - started:.1f}s")
+
+        for ef_search in ef_values:
+            connection.execute(text(f"SET hnsw.ef_search = {int(ef_search)}"))
+            approximate, latency = _run(connection, query_vectors, k)
+            recall = statistics.mean(len(a & e) / k for a, e in zip(approximate, exact))
+            print(f"hnsw ef_search={ef_search:<4d} recall@{k}={recall:.3f} {latency}")
+
+        connection.execute(text(f"DROP TABLE {TABLE}"))
+        connection.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HNSW recall/latency vs exact scan")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[20, 40, 80, 160])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.rows, args.queries, args.k, args.clusters, args.ef_search, args.seed)
@@ -0,0 +1,327 @@
+"""
+This file implements the bulk import of opportunities from CSV or NDJSON.
+
+Rows are parsed one at a time from the input stream and validated against
+`schemas.OpportunityCreate`; invalid rows are reported with their row number and
+skipped, the rest are collected into batches. Each batch is embedded with one Gemini
+request (`embed_texts`) while the batch's distinct locations are geocoded by a small
+pool of threads, and is then inserted with a single executemany and committed. A batch
+the database rejects is retried row by row, so one bad row doesn't cost the others.
+Rows whose embedding failed are stored with a NULL embedding for `backfill.py`, and
+rows whose location could not be geocoded without coordinates (listed in `warnings`);
+neither aborts the import.
+
+CSV needs a header row with the OpportunityCreate field names (title, description,
+type, location, lat, lng, tags); tags are separated by commas or semicolons. NDJSON has
+one JSON object per line with the same fields.
+
+CSV that can't be tokenized (an unterminated quote, stray characters after a closing
+quote, ...) leaves no way to tell where the next row starts, so it ends the import with
+MalformedInputError naming the line; the rows before it are still imported.
+
+Run it from the command line:
+    python -m backend.bulk_import listings.csv --provider-id 42
+or upload the file to POST /api/opportunities/bulk.
+"""
+import argparse
+import csv
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .backfill import MAX_BATCH_SIZE, opportunity_embedding_text
+from .config import BULK_IMPORT_GEOCODE_CONCURRENCY
+
+FORMATS = ("csv", "ndjson")
+# Beyond this many, errors are counted but not listed in the result
+MAX_REPORTED_ERRORS = 1000
+
+_TAG_SEPARATOR = re.compile(r"[,;]")
+
+
+class MalformedInputError(ValueError):
+    """The input can't be parsed past `line_number`. `report` has what was imported before it."""
+
+    def __init__(self, line_number: int, message: str):
+        super().__init__(f"line {line_number}: {message}")
+        self.line_number = line_number
+        self.report: Optional[dict] = None
+
+
+def detect_format(name: Optional[str] = None, content_type: Optional[str] = None) -> Optional[str]:
+    """'csv' or 'ndjson' from a file name or a Content-Type header, None if neither says."""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines"):
+        return "ndjson"
+    name = (name or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def _csv_record(record: dict) -> dict:
+    # Empty cells mean "not given", so optional fields fall back to their defaults
+    data = {key.strip(): value.strip() for key, value in record.items() if key and value and value.strip()}
+    if "tags" in data:
+        data["tags"] = [tag.strip() for tag in _TAG_SEPARATOR.split(data["tags"]) if tag.strip()]
+    return data
+
+
+def _ndjson_record(line: str) -> dict:
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    if isinstance(data.get("tags"), str):
+        data["tags"] = [tag.strip() for tag in _TAG_SEPARATOR.split(data["tags"]) if tag.strip()]
+    return data
+
+
+def _csv_records(lines: Iterable[str]) -> Iterator[dict]:
+    """The CSV records in `lines`; MalformedInputError (with the record's first line) on bad quoting."""
+    lines_read = 0
+
+    def counted():
+        nonlocal lines_read
+        for line in lines:
+            lines_read += 1
+            yield line
+
+    # strict: a stray or unterminated quote is an error instead of silently swallowing the rows after it
+    reader = iter(csv.DictReader(counted(), strict=True))
+    while True:
+        record_line = lines_read + 1
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            raise MalformedInputError(record_line, f"malformed CSV ({e})") from e
+        yield record
+
+
+def parse_rows(lines: Iterable[str], fmt: str) -> Iterator[tuple[int, Optional[schemas.OpportunityCreate], Optional[str]]]:
+    """Yields (row number, validated row, None) or (row number, None, error) per record.
+
+    Row numbers are 1-based and count records, not the CSV header or blank NDJSON lines.
+    """
+    if fmt == "csv":
+        records = (_csv_record, _csv_records(lines))
+    elif fmt == "ndjson":
+        records = (_ndjson_record, (line for line in lines if line.strip()))
+    else:
+        raise ValueError(f"unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+    to_dict, source = records
+    for row_number, record in enumerate(source, start=1):
+        try:
+            yield row_number, schemas.OpportunityCreate.model_validate(to_dict(record)), None
+        except ValidationError as e:
+            yield row_number, None, "; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in e.errors()
+            )
+        except ValueError as e:
+            yield row_number, None, f"invalid JSON: {e}"
+
+
+class ImportReport:
+    """Counters and per-row errors of one import."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.embedded = 0
+        self.geocoded = 0
+        self.errors = []
+        self.warnings = []
+
+    def error(self, row_number: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+    def warning(self, row_number: int, message: str):
+        """A row that was imported, but incompletely."""
+        if len(self.warnings) < MAX_REPORTED_ERRORS:
+            self.warnings.append({"row": row_number, "warning": message})
+
+    def as_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "embedded": self.embedded,
+            "geocoded": self.geocoded,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "warnings": self.warnings,
+            "elapsed_seconds": round(elapsed, 2),
+            "rows_per_second": round(self.rows / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+def _enrich(
+    batch: list[tuple[int, schemas.OpportunityCreate]],
+    embed_texts: Callable[[list[str]], Optional[list[list[float]]]],
+    geocode: Callable[[str], Optional[dict]],
+    geocoded_locations: dict,
+    executor: ThreadPoolExecutor,
+) -> tuple[Optional[list[list[float]]], dict]:
+    """Embeds the batch and geocodes its new locations (into `geocoded_locations`) concurrently.
+
+    Returns (vectors or None, {location: error message} for the lookups that raised).
+    Neither kind of failure is fatal: the rows go in without embedding or coordinates.
+    """
+    def safe_geocode(location):
+        try:
+            return geocode(location), None
+        except Exception as e:
+            return None, str(e) or type(e).__name__
+
+    texts = [opportunity_embedding_text(row.title, row.description, row.tags) for _, row in batch]
+    embedding = executor.submit(embed_texts, texts)
+    # Each distinct location once per import, and only for rows without coordinates
+    locations = {
+        row.location for _, row in batch
+        if row.location and (row.lat is None or row.lng is None) and row.location not in geocoded_locations
+    }
+    geocode_errors = {}
+    for location, (coords, error) in zip(locations, executor.map(safe_geocode, locations)):
+        if error is not None:
+            # Not remembered, so a later batch with the same location tries again
+            geocode_errors[location] = error
+        else:
+            geocoded_locations[location] = coords
+    try:
+        vectors = embedding.result()
+    except Exception as e:
+        # Like embed_texts returning None: stored without embeddings, for backfill.py
+        print(f"Bulk import: embedding a batch failed ({e})")
+        vectors = None
+    return vectors, geocode_errors
+
+
+def _insert_batch(db: Session, values: list[dict], row_numbers: list[int], report: ImportReport):
+    try:
+        db.execute(insert(models.Opportunity), values)
+        db.commit()
+        report.inserted += len(values)
+        return
+    except SQLAlchemyError:
+        db.rollback()
+    # Find the offending rows: one savepoint per row, one commit for the rest
+    for row_number, value in zip(row_numbers, values):
+        try:
+            with db.begin_nested():
+                db.execute(insert(models.Opportunity), [value])
+            report.inserted += 1
+        except SQLAlchemyError as e:
+            report.error(row_number, f"database error: {str(getattr(e, 'orig', e)).strip()}")
+    db.commit()
+
+
+def import_opportunities(
+    db: Session,
+    lines: Iterable[str],
+    fmt: str,
+    provider_id: int,
+    embed_texts: Callable[[list[str]], Optional[list[list[float]]]],
+    geocode: Callable[[str], Optional[dict]],
+    batch_size: int = MAX_BATCH_SIZE,
+) -> dict:
+    """Imports the opportunities in `lines` (CSV or NDJSON text) for `provider_id`.
+
+    Returns the counts and the per-row errors; invalid or rejected rows never abort the import.
+    Input that can't be parsed any further raises MalformedInputError once the rows before it are in.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    report = ImportReport()
+    geocoded_locations = {}
+
+    def flush(batch):
+        vectors, geocode_errors = _enrich(batch, embed_texts, geocode, geocoded_locations, executor)
+        vectors = vectors or [None] * len(batch)
+        values = []
+        for (row_number, row), vector in zip(batch, vectors):
+            if row.location in geocode_errors:
+                report.warning(row_number, f"geocoding {row.location!r} failed: {geocode_errors[row.location]}")
+            lat, lng = row.lat, row.lng
+            if (lat is None or lng is None) and geocoded_locations.get(row.location):
+                lat, lng = geocoded_locations[row.location]["lat"], geocoded_locations[row.location]["lng"]
+                report.geocoded += 1
+            report.embedded += vector is not None
+            values.append({
+                "provider_id": provider_id,
+                "title": row.title,
+                "description": row.description,
+                "type": row.type,
+                "location": row.location,
+                "lat": lat,
+                "lng": lng,
+                "tags": row.tags,
+                # Core inserts bypass the @validates hook that keeps tag_keys in sync
+                "tag_keys": models.normalize_tags(row.tags),
+                "embedding": vector,
+            })
+        _insert_batch(db, values, [row_number for row_number, _ in batch], report)
+
+    with ThreadPoolExecutor(max_workers=BULK_IMPORT_GEOCODE_CONCURRENCY + 1) as executor:
+        batch = []
+        try:
+            for row_number, row, error in parse_rows(lines, fmt):
+                report.rows += 1
+                if error:
+                    report.error(row_number, error)
+                    continue
+                batch.append((row_number, row))
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    batch = []
+        except MalformedInputError as e:
+            if batch:
+                flush(batch)
+            e.report = report.as_dict()
+            raise
+        if batch:
+            flush(batch)
+
+    return report.as_dict()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import opportunities from a CSV or NDJSON file.")
+    parser.add_argument("path")
+    parser.add_argument("--provider-id", type=int, required=True)
+    parser.add_argument("--format", choices=FORMATS, default=None, help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("cannot tell the format from the file name; pass --format")
+
+    from .database import SessionLocal
+    from .main import embed_texts, geocode_location
+
+    with open(args.path, newline="", encoding="utf-8-sig") as f, SessionLocal() as session:
+        try:
+            print(json.dumps(import_opportunities(
+                session, f, fmt, args.provider_id, embed_texts, geocode_location, batch_size=args.batch_size,
+            ), indent=2))
+        except MalformedInputError as e:
+            print(json.dumps(e.report, indent=2))
+            parser.exit(1, f"error: {e}\n")
@@ -1,5 +1,108 @@
 import os
+from dotenv import load_dotenv
+
+# Settings below may come from a .env file (especially for local development)
+load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "8d2c49cad93078b15c378441666b1ef454bb4114d6e969576d27ef7d6d93885b")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Shared secret for the /api/admin routes, sent as the X-Admin-Token header. Unset disables them.
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN") or None
+# Authenticated users are cached per worker for this long (see principal_cache.py)
+AUTH_PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+AUTH_PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+# Password hashing (see password_hashing.py). Changing the Argon2 costs rehashes each
+# password at its next login; ARGON2_MEMORY_COST_KIB is per hash in flight.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST_KIB = int(os.getenv("ARGON2_MEMORY_COST_KIB", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+# Threads that hash passwords (at most this many hashes use CPU at once) and how many
+# jobs may wait for them before sign-ins get a 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "256"))
+
+# Embedding cache (see embedding_cache.py). Set EMBEDDING_CACHE_PATH to keep a copy on disk.
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "2048"))
+EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", str(24 * 3600)))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH") or None
+EMBEDDING_CACHE_DISK_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ENTRIES", "100000"))
+
+# Local intent classification (see intent.py). Below this confidence handle_chat asks Gemini.
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.7"))
+
+# Semantic answer cache for general questions (see answer_cache.py)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_MIN_SIMILARITY = float(os.getenv("ANSWER_CACHE_MIN_SIMILARITY", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+# Knowledge base for general questions (see knowledge_base.py)
+KB_DOCS_DIR = os.getenv("KB_DOCS_DIR") or None
+KB_CHUNK_CHARS = int(os.getenv("KB_CHUNK_CHARS", "1200"))
+KB_TOP_K = int(os.getenv("KB_TOP_K", "6"))
+KB_TOKEN_BUDGET = int(os.getenv("KB_TOKEN_BUDGET", "1500"))
+
+# pgvector HNSW index on opportunities.embedding (see vector_search.py).
+# m / ef_construction only apply when the index is (re)built; ef_search applies per query.
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))
+
+# Hybrid full-text + vector retrieval (see hybrid_search.py)
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_CANDIDATES_PER_LIST = int(os.getenv("HYBRID_CANDIDATES_PER_LIST", "20"))
+# How many fused candidates the chat sends to the Gemini relevance filter
+CHAT_FILTER_CANDIDATES = int(os.getenv("CHAT_FILTER_CANDIDATES", "6"))
+
+# Database connection pools (see database.py); apply to the sync and the async engine each
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Connections older than this are replaced (seconds; -1 disables)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test connections on checkout, so ones dropped by a Postgres restart are replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Server-side statement_timeout for every connection (milliseconds; 0 disables)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+# Bulk opportunity import (see bulk_import.py)
+# Geocoding requests in flight at once while a batch is being imported
+BULK_IMPORT_GEOCODE_CONCURRENCY = int(os.getenv("BULK_IMPORT_GEOCODE_CONCURRENCY", "8"))
+# Largest upload POST /api/opportunities/bulk accepts (bytes)
+BULK_IMPORT_MAX_BYTES = int(os.getenv("BULK_IMPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Outbound Gemini calls (see gemini_client.py). Limits are per worker process.
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+# Token buckets; 0 disables the limit
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "300"))
+GEMINI_TOKENS_PER_MINUTE = float(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+# Retries of 429/5xx/timeouts, with jittered exponential backoff (seconds)
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "0.5"))
+GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "8"))
+# How long a call may wait for capacity before giving up (interactive / background lane)
+GEMINI_MAX_WAIT_SECONDS = float(os.getenv("GEMINI_MAX_WAIT_SECONDS", "20"))
+GEMINI_BACKGROUND_MAX_WAIT_SECONDS = float(os.getenv("GEMINI_BACKGROUND_MAX_WAIT_SECONDS", "300"))
+
+# Geocoding with Geoapify (see geocoding.py)
+GEOCODE_TIMEOUT_SECONDS = float(os.getenv("GEOCODE_TIMEOUT_SECONDS", "10"))
+# Shared by every lookup in this worker; Geoapify's free plan allows 5 per second
+GEOCODE_REQUESTS_PER_SECOND = float(os.getenv("GEOCODE_REQUESTS_PER_SECOND", "5"))
+# Lookups in flight at once in the re-geocode job
+GEOCODE_CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", "5"))
+# How long cached results are used (seconds): found places (0 = forever) and misses
+GEOCODE_CACHE_TTL_SECONDS = int(os.getenv("GEOCODE_CACHE_TTL_SECONDS", "0"))
+GEOCODE_NEGATIVE_TTL_SECONDS = int(os.getenv("GEOCODE_NEGATIVE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Scraping provider URLs for verification (see scraping.py)
+# Per request, and for all of a verification's URLs together (seconds)
+SCRAPE_TIMEOUT_SECONDS = float(os.getenv("SCRAPE_TIMEOUT_SECONDS", "8"))
+SCRAPE_DEADLINE_SECONDS = float(os.getenv("SCRAPE_DEADLINE_SECONDS", "12"))
+# Scraped pages are reused for this long, then revalidated with ETag/Last-Modified
+SCRAPE_CACHE_TTL_SECONDS = int(os.getenv("SCRAPE_CACHE_TTL_SECONDS", str(24 * 3600)))
+SCRAPE_MAX_CONNECTIONS = int(os.getenv("SCRAPE_MAX_CONNECTIONS", "20"))
+# At most this much of a page is downloaded and parsed; the summary comes from its start
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(1024 * 1024)))
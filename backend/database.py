@@ -1,20 +1,118 @@
 """
 This file handles the database connection and session management for the application.
-It sets up the SQLAlchemy engine and provides a session factory for interacting
-with the database.
+It sets up the SQLAlchemy engines (sync and async) and provides the session factories
+and FastAPI dependencies for interacting with the database.
+
+Both engines share the pool settings from config.py (DB_POOL_*), test connections
+before use (pre-ping) so connections killed by a Postgres restart are replaced instead
+of failing a request, and set a server-side statement_timeout on every connection.
+The time requests spend waiting for a pooled connection is recorded per engine and
+reported by /api/admin/metrics.
+
+Creating the engines does not connect: the first connection is opened by the first
+request that needs one. The schema itself is managed by Alembic (alembic.ini and
+migrations/), never at import or startup.
 """
-from sqlalchemy import create_engine
+import functools
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from a .env file (especially for local development)
-load_dotenv()
+# config.py also loads the .env file (especially for local development)
+from .config import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_TIMEOUT_MS,
+)
 
 # The connection string for the database, loaded from environment variables.
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
+
+class PoolWaitStats:
+    """Checkout wait times of one connection pool (kept for the last `window` checkouts)."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            self._recent.append(waited)
+
+    def stats(self, pool) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            checkouts, timeouts = self.checkouts, self.timeouts
+            total, longest = self.total_wait_seconds, self.max_wait_seconds
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_ms_mean": round(total / checkouts * 1000, 3) if checkouts else 0.0,
+            "wait_ms_p95": round(recent[int(len(recent) * 0.95) - 1] * 1000, 3) if len(recent) >= 20 else None,
+            "wait_ms_max": round(longest * 1000, 3),
+        }
+
+
+def _timed(pool_class, wait_stats: PoolWaitStats):
+    """A subclass of `pool_class` that records how long each checkout waited."""
+
+    class TimedPool(pool_class):
+        # A class attribute, so the pools built by dispose()/recreate() keep reporting here
+        wait_stats = None
+
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except Exception:
+                self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+                raise
+            self.wait_stats.record(time.perf_counter() - started)
+            return connection
+
+    TimedPool.wait_stats = wait_stats
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+def _pool_options(pool_class, wait_stats: PoolWaitStats) -> dict:
+    return {
+        "poolclass": _timed(pool_class, wait_stats),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+sync_pool_waits = PoolWaitStats()
+async_pool_waits = PoolWaitStats()
+
 # The main entry point for SQLAlchemy to communicate with the database.
 # The logic here handles different connection arguments for SQLite vs. PostgreSQL.
 if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
@@ -22,12 +120,88 @@ if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
         SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
     )
 else:
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    connect_args = {}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args=connect_args,
+        **_pool_options(QueuePool, sync_pool_waits),
+    )
 
 # A factory for creating new database sessions.
 # Each instance of SessionLocal will be a new database session.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The async counterpart, used by the endpoints that spend most of their time waiting
+# on Gemini or outbound HTTP (chat, recommendations, verification). Same database,
+# different driver: asyncpg instead of psycopg2.
+def _async_database_url(url: str) -> str:
+    if url.startswith("sqlite"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+ASYNC_SQLALCHEMY_DATABASE_URL = _async_database_url(SQLALCHEMY_DATABASE_URL)
+if ASYNC_SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+else:
+    async_connect_args = {}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        async_connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+    async_engine = create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URL,
+        connect_args=async_connect_args,
+        **_pool_options(AsyncAdaptedQueuePool, async_pool_waits),
+    )
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def get_db():
+    """FastAPI dependency: a sync session, closed when the request is done."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    """FastAPI dependency: an async session, closed when the request is done."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_metrics() -> dict:
+    """Pool occupancy and checkout wait times for both engines."""
+    metrics = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        wait_stats = getattr(pool, "wait_stats", None)
+        if wait_stats is not None:
+            metrics[name] = wait_stats.stats(pool)
+    return metrics
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+@functools.lru_cache(maxsize=1)
+def expected_schema_revision() -> str:
+    """The head revision in migrations/versions, i.e. what `alembic upgrade head` applies."""
+    # Imported here: only the readiness probe needs Alembic, not every worker at boot
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    return ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_current_head()
+
+
+async def current_schema_revision(db: AsyncSession):
+    """The revision the database is at, or None if it has never been migrated."""
+    try:
+        return (await db.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+    except Exception:
+        await db.rollback()
+        return None
+
 # A base class for our declarative models (like User in models.py).
 # The models will inherit from this class.
 Base = declarative_base()
@@ -0,0 +1,222 @@
+"""
+This file provides a bounded, in-process cache for text embeddings.
+
+Embedding calls are a network round trip to Gemini, and the same handful of
+queries ("python internship", the seeker profile query, ...) are embedded over
+and over. The cache sits in front of `generate_embedding` in main.py and keeps
+the most recently used vectors in memory, with an optional SQLite file on disk
+so a restarted worker does not start cold.
+
+The disk tier holds at most `disk_max_entries` vectors (the oldest are pruned every
+DISK_PRUNE_EVERY writes) and has a lock of its own, so a slow disk never holds up
+memory hits. Async callers use `aget`/`aset`, which run the disk I/O in a thread.
+"""
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Writes between two prunes of the disk tier
+DISK_PRUNE_EVERY = 100
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace and case so trivially different queries share a key."""
+    return _WHITESPACE_RE.sub(" ", text or "").strip().lower()
+
+
+class EmbeddingCache:
+    """An LRU + TTL cache of embeddings keyed by (model name, normalized text)."""
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 24 * 3600, disk_path: Optional[str] = None,
+                 disk_max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._entries: "OrderedDict[tuple[str, str], tuple[float, list[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes use of the SQLite connection; never taken while holding `_lock`
+        self._disk_lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path: str):
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text TEXT NOT NULL, created_at REAL NOT NULL, vector TEXT NOT NULL, "
+                "PRIMARY KEY (model, text))"
+            )
+            self._disk.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_created_at ON embeddings (created_at)")
+            self._disk.commit()
+            with self._disk_lock:
+                self._prune_disk()
+        except sqlite3.Error as e:
+            print(f"EmbeddingCache: disk tier disabled ({e})")
+            self._disk = None
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def get(self, model: str, text: str) -> Optional[list[float]]:
+        key = (model, normalize_text(text))
+        vector = self._memory_get(key)
+        if vector is None and self._disk is not None:
+            vector = self._disk_get(key)
+        if vector is None:
+            self._count_miss()
+        return vector
+
+    async def aget(self, model: str, text: str) -> Optional[list[float]]:
+        """`get` for the event loop: memory hits are served inline, disk reads in a thread."""
+        key = (model, normalize_text(text))
+        vector = self._memory_get(key)
+        if vector is None and self._disk is not None:
+            vector = await asyncio.to_thread(self._disk_get, key)
+        if vector is None:
+            self._count_miss()
+        return vector
+
+    def set(self, model: str, text: str, vector: list[float]):
+        if not vector:
+            return
+        key = (model, normalize_text(text))
+        created_at = time.time()
+        with self._lock:
+            self._store(key, created_at, vector)
+        if self._disk is not None:
+            self._disk_put(key, created_at, vector)
+
+    async def aset(self, model: str, text: str, vector: list[float]):
+        """`set` for the event loop: the disk write runs in a thread."""
+        if not vector:
+            return
+        key = (model, normalize_text(text))
+        created_at = time.time()
+        with self._lock:
+            self._store(key, created_at, vector)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk_put, key, created_at, vector)
+
+    def _memory_get(self, key: tuple[str, str]) -> Optional[list[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, vector = entry
+            if self._expired(created_at):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def _count_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _store(self, key: tuple[str, str], created_at: float, vector: list[float]):
+        # Caller must hold the lock.
+        self._entries[key] = (created_at, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: tuple[str, str]) -> Optional[list[float]]:
+        # A disk hit is promoted back into memory.
+        try:
+            with self._disk_lock:
+                row = self._disk.execute(
+                    "SELECT created_at, vector FROM embeddings WHERE model = ? AND text = ?", key
+                ).fetchone()
+                if row is None:
+                    return None
+                created_at, raw_vector = row
+                if self._expired(created_at):
+                    self._disk.execute("DELETE FROM embeddings WHERE model = ? AND text = ?", key)
+                    self._disk.commit()
+                    return None
+            vector = json.loads(raw_vector)
+        except sqlite3.Error as e:
+            print(f"EmbeddingCache: disk read failed ({e})")
+            return None
+        with self._lock:
+            self._store(key, created_at, vector)
+            self.disk_hits += 1
+        return vector
+
+    def _disk_put(self, key: tuple[str, str], created_at: float, vector: list[float]):
+        raw_vector = json.dumps(list(vector))
+        try:
+            with self._disk_lock:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO embeddings (model, text, created_at, vector) VALUES (?, ?, ?, ?)",
+                    (key[0], key[1], created_at, raw_vector),
+                )
+                self._disk.commit()
+                self._disk_writes += 1
+                if self._disk_writes % DISK_PRUNE_EVERY == 0:
+                    self._prune_disk()
+        except sqlite3.Error as e:
+            print(f"EmbeddingCache: disk write failed ({e})")
+
+    def _prune_disk(self):
+        # Caller must hold the disk lock. Drops expired rows, then the oldest beyond disk_max_entries.
+        deleted = 0
+        if self.ttl_seconds > 0:
+            deleted += self._disk.execute(
+                "DELETE FROM embeddings WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+        deleted += self._disk.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,),
+        ).rowcount
+        self._disk.commit()
+        with self._lock:
+            self.disk_evictions += deleted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.execute("DELETE FROM embeddings")
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_path": self.disk_path if self._disk is not None else None,
+                "disk_max_entries": self.disk_max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
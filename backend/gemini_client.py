@@ -0,0 +1,352 @@
+"""
+This file governs every outbound Gemini call: rate limits, concurrency, retries and priority.
+
+Calls go through `call` (sync), `call_async` or `stream_async`, which
+  - wait for a slot: at most GEMINI_MAX_CONCURRENCY requests in flight, and token buckets
+    for requests per minute and (estimated) input tokens per minute,
+  - serve waiting calls by lane, INTERACTIVE (chat, intent, recommendations) before
+    BACKGROUND (verification, backfill, bulk import, knowledge base indexing), and in
+    arrival order within a lane,
+  - retry 429/5xx/timeouts with jittered exponential backoff, giving the slot back while
+    backing off,
+  - raise GeminiBusy when no slot frees up within the lane's wait limit or Gemini keeps
+    answering 429, which the endpoints turn into a 503 instead of a 500.
+
+Wait times per lane, retries and refusals are reported by /api/admin/metrics. The limits
+are per worker process: divide the project's quota by the number of workers.
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from google.api_core import exceptions as google_exceptions
+
+from .config import (
+    GEMINI_BACKGROUND_MAX_WAIT_SECONDS,
+    GEMINI_BACKOFF_BASE_SECONDS,
+    GEMINI_BACKOFF_MAX_SECONDS,
+    GEMINI_MAX_CONCURRENCY,
+    GEMINI_MAX_RETRIES,
+    GEMINI_MAX_WAIT_SECONDS,
+    GEMINI_REQUESTS_PER_MINUTE,
+    GEMINI_TOKENS_PER_MINUTE,
+)
+from .knowledge_base import estimate_tokens
+
+INTERACTIVE = 0
+BACKGROUND = 1
+LANES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_RATE_LIMITED = (google_exceptions.TooManyRequests, google_exceptions.ResourceExhausted)
+_RETRYABLE = _RATE_LIMITED + (
+    google_exceptions.InternalServerError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+class GeminiBusy(Exception):
+    """Gemini capacity is exhausted for now (local limits or 429s); worth retrying later."""
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, up to `per_minute`. Not thread-safe on its own."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        # A request larger than the whole bucket waits for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class _Waiter:
+    """One call waiting for a slot, woken from whichever thread frees one up."""
+
+    def __init__(self, priority: int, seq: int, tokens: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.granted = False
+        self.cancelled = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def wake(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class GeminiLimiter:
+    """Admission control for Gemini requests, shared by threads and event loops."""
+
+    def __init__(self, max_concurrency: int, requests_per_minute: float, tokens_per_minute: float):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._lanes = {
+            lane: {"acquired": 0, "throttled": 0, "retries": 0, "failures": 0, "waits": deque(maxlen=1000), "max_wait": 0.0}
+            for lane in LANES
+        }
+
+    def _dispatch(self) -> Optional[float]:
+        """Grants slots to waiters in priority order. Caller must hold the lock.
+
+        Returns how long until the first waiter could go if only the buckets hold it back
+        (None if nobody waits or the concurrency limit does, which release() resolves).
+        """
+        now = time.monotonic()
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.refill(now)
+        while self._waiters:
+            waiter = self._waiters[0]
+            if waiter.cancelled:
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_flight >= self.max_concurrency:
+                return None
+            delay = max(
+                self.requests.wait_time(1) if self.requests else 0.0,
+                self.tokens.wait_time(waiter.tokens) if self.tokens else 0.0,
+            )
+            if delay > 0:
+                return delay
+            heapq.heappop(self._waiters)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(waiter.tokens)
+            self.in_flight += 1
+            waiter.wake()
+        return None
+
+    def _enqueue(self, priority: int, tokens: int, loop=None) -> tuple[_Waiter, Optional[float]]:
+        waiter = _Waiter(priority, next(self._seq), tokens, loop)
+        with self._lock:
+            heapq.heappush(self._waiters, waiter)
+            return waiter, self._dispatch()
+
+    def _give_up(self, waiter: _Waiter, timed_out: bool = True) -> bool:
+        """Withdraws a waiter; False if it was granted a slot in the meantime (then it's kept)."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            waiter.cancelled = True
+            if timed_out:
+                self._lanes[waiter.priority]["throttled"] += 1
+            return True
+
+    def _record_wait(self, priority: int, waited: float):
+        with self._lock:
+            lane = self._lanes[priority]
+            lane["acquired"] += 1
+            lane["waits"].append(waited)
+            lane["max_wait"] = max(lane["max_wait"], waited)
+
+    def _redispatch(self) -> Optional[float]:
+        with self._lock:
+            return self._dispatch()
+
+    def acquire(self, priority: int, tokens: int, max_wait: float):
+        """Blocks the calling thread until a slot is granted; GeminiBusy after `max_wait` seconds."""
+        started = time.monotonic()
+        waiter, delay = self._enqueue(priority, tokens)
+        while not waiter.granted:
+            remaining = started + max_wait - time.monotonic()
+            if remaining <= 0:
+                if self._give_up(waiter):
+                    raise GeminiBusy(f"no Gemini capacity within {max_wait:g}s")
+                break
+            waiter.event.wait(remaining if delay is None else min(remaining, delay))
+            delay = self._redispatch()
+        self._record_wait(priority, time.monotonic() - started)
+
+    async def acquire_async(self, priority: int, tokens: int, max_wait: float):
+        """Awaits a slot without blocking the event loop; GeminiBusy after `max_wait` seconds."""
+        started = time.monotonic()
+        waiter, delay = self._enqueue(priority, tokens, asyncio.get_running_loop())
+        try:
+            while not waiter.granted:
+                remaining = started + max_wait - time.monotonic()
+                if remaining <= 0:
+                    if self._give_up(waiter):
+                        raise GeminiBusy(f"no Gemini capacity within {max_wait:g}s")
+                    break
+                await asyncio.wait({waiter.future}, timeout=remaining if delay is None else min(remaining, delay))
+                delay = self._redispatch()
+        except asyncio.CancelledError:
+            # The caller went away: withdraw, or hand back a slot granted just now
+            if not self._give_up(waiter, timed_out=False):
+                self.release()
+            raise
+        self._record_wait(priority, time.monotonic() - started)
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def count(self, priority: int, name: str):
+        with self._lock:
+            self._lanes[priority][name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._dispatch()
+            queued = {lane: 0 for lane in LANES}
+            for waiter in self._waiters:
+                if not waiter.cancelled:
+                    queued[waiter.priority] += 1
+            lanes = {}
+            for priority, name in LANES.items():
+                lane = self._lanes[priority]
+                waits = sorted(lane["waits"])
+                lanes[name] = {
+                    "queued": queued[priority],
+                    "acquired": lane["acquired"],
+                    "throttled": lane["throttled"],
+                    "retries": lane["retries"],
+                    "failures": lane["failures"],
+                    "wait_ms_mean": round(sum(waits) / len(waits) * 1000, 3) if waits else 0.0,
+                    "wait_ms_p95": round(waits[int(len(waits) * 0.95) - 1] * 1000, 3) if len(waits) >= 20 else None,
+                    "wait_ms_max": round(lane["max_wait"] * 1000, 3),
+                }
+            return {
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "requests_available": round(self.requests.level, 1) if self.requests else None,
+                "tokens_available": round(self.tokens.level) if self.tokens else None,
+                "lanes": lanes,
+            }
+
+
+limiter = GeminiLimiter(GEMINI_MAX_CONCURRENCY, GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE)
+
+
+def _estimate_request_tokens(args, kwargs) -> int:
+    """Input tokens of a request, estimated from its text arguments (the prompt or content)."""
+    total = 0
+    for value in itertools.chain(args, (v for k, v in kwargs.items() if k != "model")):
+        if isinstance(value, str):
+            total += estimate_tokens(value)
+        elif isinstance(value, (list, tuple)):
+            total += sum(estimate_tokens(item) for item in value if isinstance(item, str))
+    return max(1, total)
+
+
+def _max_wait(priority: int) -> float:
+    return GEMINI_MAX_WAIT_SECONDS if priority == INTERACTIVE else GEMINI_BACKGROUND_MAX_WAIT_SECONDS
+
+
+def _backoff(attempt: int) -> float:
+    # "Full jitter": spreads out the retries of callers that failed together
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX_SECONDS, GEMINI_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _should_retry(error: Exception, attempt: int, priority: int) -> bool:
+    if not isinstance(error, _RETRYABLE) or attempt >= GEMINI_MAX_RETRIES:
+        limiter.count(priority, "failures")
+        return False
+    limiter.count(priority, "retries")
+    return True
+
+
+def _raise_final(error: Exception):
+    """Re-raises the last error of a call; 429s that outlasted the retries become GeminiBusy."""
+    if isinstance(error, _RATE_LIMITED):
+        raise GeminiBusy(f"Gemini rate limit: {error}") from error
+    raise error
+
+
+def call(fn, *args, priority: int = INTERACTIVE, **kwargs):
+    """Runs a blocking Gemini call (e.g. `genai.embed_content`) under the limits, with retries."""
+    tokens = _estimate_request_tokens(args, kwargs)
+    for attempt in itertools.count():
+        limiter.acquire(priority, tokens, _max_wait(priority))
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            error = e
+        finally:
+            limiter.release()
+        if not _should_retry(error, attempt, priority):
+            _raise_final(error)
+        time.sleep(_backoff(attempt))
+
+
+async def call_async(fn, *args, priority: int = INTERACTIVE, **kwargs):
+    """Awaits an async Gemini call (e.g. `model.generate_content_async`) under the limits, with retries."""
+    tokens = _estimate_request_tokens(args, kwargs)
+    for attempt in itertools.count():
+        await limiter.acquire_async(priority, tokens, _max_wait(priority))
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            error = e
+        finally:
+            limiter.release()
+        if not _should_retry(error, attempt, priority):
+            _raise_final(error)
+        await asyncio.sleep(_backoff(attempt))
+
+
+async def stream_async(fn, *args, priority: int = INTERACTIVE, **kwargs):
+    """Yields the chunks of a streamed Gemini call (`stream=True`), holding one slot throughout.
+
+    Only failures before the first chunk are retried; after that the caller has output.
+    """
+    tokens = _estimate_request_tokens(args, kwargs)
+    for attempt in itertools.count():
+        await limiter.acquire_async(priority, tokens, _max_wait(priority))
+        started_output = False
+        try:
+            response = await fn(*args, **kwargs)
+            async for chunk in response:
+                started_output = True
+                yield chunk
+            return
+        except Exception as e:
+            if started_output:
+                raise
+            error = e
+        finally:
+            limiter.release()
+        if not _should_retry(error, attempt, priority):
+            _raise_final(error)
+        await asyncio.sleep(_backoff(attempt))
@@ -0,0 +1,77 @@
+"""
+This file implements the distance ("near me") searches over `opportunities.lat/lng`.
+
+A radius search runs in two steps:
+  1. a bounding-box prefilter, `point(lng, lat) <@ box(...)`, which is answered by the
+     GiST index on `point(lng, lat)` (see models.py) and cheaply narrows the table down
+     to the rows inside the box around the circle;
+  2. the exact great-circle (haversine) distance on those rows only, which drops the
+     corners of the box and is what results are ordered by.
+
+Boxes that cross the antimeridian are split in two, and a circle that reaches a pole
+covers every longitude.
+"""
+import math
+from typing import Optional
+
+from sqlalchemy import and_, func, or_
+
+from . import models
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_RADIUS_KM = 1000.0
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points, in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_boxes(lat: float, lng: float, radius_km: float) -> list[tuple[float, float, float, float]]:
+    """(min_lng, min_lat, max_lng, max_lat) boxes that together contain the circle."""
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - d_lat, lat + d_lat
+    if min_lat <= -90 or max_lat >= 90:
+        # The circle contains a pole: every longitude is in range
+        return [(-180.0, max(min_lat, -90.0), 180.0, min(max_lat, 90.0))]
+
+    # Widest longitude span of the circle (at the latitude of its tangent points)
+    d_lng = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat)))))
+    min_lng, max_lng = lng - d_lng, lng + d_lng
+    if min_lng < -180:
+        return [(-180.0, min_lat, max_lng, max_lat), (min_lng + 360, min_lat, 180.0, max_lat)]
+    if max_lng > 180:
+        return [(min_lng, min_lat, 180.0, max_lat), (-180.0, min_lat, max_lng - 360, max_lat)]
+    return [(min_lng, min_lat, max_lng, max_lat)]
+
+
+def distance_km(lat: float, lng: float):
+    """SQL expression: haversine distance from (lat, lng) to each opportunity, in km."""
+    lat_col, lng_col = models.Opportunity.lat, models.Opportunity.lng
+    a = (
+        func.power(func.sin(func.radians(lat_col - lat) / 2), 2)
+        + func.cos(func.radians(lat)) * func.cos(func.radians(lat_col))
+        * func.power(func.sin(func.radians(lng_col - lng) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.least(1.0, func.sqrt(a)))
+
+
+def within_radius(lat: float, lng: float, radius_km: float):
+    """SQL condition: the opportunity is at most `radius_km` from (lat, lng)."""
+    point = func.point(models.Opportunity.lng, models.Opportunity.lat)
+    in_box = or_(*[
+        point.op("<@")(func.box(func.point(min_lng, min_lat), func.point(max_lng, max_lat)))
+        for min_lng, min_lat, max_lng, max_lat in bounding_boxes(lat, lng, radius_km)
+    ])
+    return and_(in_box, distance_km(lat, lng) <= radius_km)
+
+
+def radius_filter(lat: Optional[float], lng: Optional[float], radius_km: Optional[float]):
+    """The within_radius condition when all three values are given, else None."""
+    if lat is None or lng is None or radius_km is None:
+        return None
+    return within_radius(lat, lng, radius_km)
@@ -0,0 +1,295 @@
+"""
+This file geocodes location text with Geoapify, behind a persistent cache.
+
+Results are stored in `geocode_cache` by normalized location text, so "Berlin" is
+looked up once, not once per opportunity. A location Geoapify can't find is cached
+too (as NULL coordinates, for GEOCODE_NEGATIVE_TTL_SECONDS) so it isn't asked about
+again on every import; request failures (timeouts, 429, 5xx) are never cached.
+All requests share one rate limit (GEOCODE_REQUESTS_PER_SECOND) and time out after
+GEOCODE_TIMEOUT_SECONDS.
+
+`geocode_missing_opportunities` is the batch job behind
+POST /api/admin/re-geocode-opportunities: it dedupes the locations of every
+opportunity without coordinates, resolves the uncached ones concurrently over one
+pooled HTTP client, and fills in the rows with one UPDATE per batch of locations.
+
+Async lookups (the endpoints and that job) share one httpx client per worker, closed on
+shutdown by `close_client`.
+"""
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import httpx
+import requests
+from sqlalchemy import Float, Text, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import (
+    GEOCODE_CACHE_TTL_SECONDS,
+    GEOCODE_CONCURRENCY,
+    GEOCODE_NEGATIVE_TTL_SECONDS,
+    GEOCODE_REQUESTS_PER_SECOND,
+    GEOCODE_TIMEOUT_SECONDS,
+)
+from .database import SessionLocal
+from .embedding_cache import normalize_text
+
+GEOAPIFY_SEARCH_URL = "https://api.geoapify.com/v1/geocode/search"
+
+
+class GeocodingError(Exception):
+    """Geoapify could not be asked (network, 429, 5xx, bad key); unlike "not found", not cached."""
+
+
+class RateLimiter:
+    """Spaces requests at least 1/per_second apart, across threads and event loops."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Books the next slot; returns how long to sleep until it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+            return slot - now
+
+
+rate_limiter = RateLimiter(GEOCODE_REQUESTS_PER_SECOND)
+# Keeps connections to Geoapify open between the sync lookups (bulk import threads)
+_http = requests.Session()
+# Same for the async lookups; see get_client
+_client: Optional[httpx.AsyncClient] = None
+_client_loop = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """The shared async client, so connections to Geoapify are reused between lookups."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    # A client is bound to the event loop it was first used on
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=GEOCODE_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=GEOCODE_CONCURRENCY, max_keepalive_connections=GEOCODE_CONCURRENCY),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def location_key(location: str) -> str:
+    return normalize_text(location)
+
+
+def _api_key() -> Optional[str]:
+    api_key = os.getenv("GEOAPIFY_API_KEY")
+    if not api_key:
+        print("Warning: GEOAPIFY_API_KEY not set. Geocoding will not work.")
+    return api_key
+
+
+def _coordinates(data: dict) -> Optional[dict]:
+    if data and data.get("features"):
+        # Geoapify returns lng, lat order
+        lng, lat = data["features"][0]["geometry"]["coordinates"]
+        return {"lat": lat, "lng": lng}
+    return None
+
+
+def _fetch(location: str, api_key: str) -> Optional[dict]:
+    time.sleep(rate_limiter.reserve())
+    try:
+        response = _http.get(
+            GEOAPIFY_SEARCH_URL, params={"text": location, "apiKey": api_key}, timeout=GEOCODE_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        return _coordinates(response.json())
+    except (requests.RequestException, ValueError) as e:
+        raise GeocodingError(str(e)) from e
+
+
+async def _fetch_async(client: httpx.AsyncClient, location: str, api_key: str) -> Optional[dict]:
+    await asyncio.sleep(rate_limiter.reserve())
+    try:
+        response = await client.get(GEOAPIFY_SEARCH_URL, params={"text": location, "apiKey": api_key})
+        response.raise_for_status()
+        return _coordinates(response.json())
+    except (httpx.HTTPError, ValueError) as e:
+        raise GeocodingError(str(e)) from e
+
+
+def _from_cache(entry: Optional[models.GeocodeCache]) -> tuple[bool, Optional[dict]]:
+    """(usable, coordinates) for a cache row; a miss is usable only while it is recent."""
+    if entry is None:
+        return False, None
+    age = datetime.now(timezone.utc) - entry.created_at
+    if entry.lat is None or entry.lng is None:
+        return age <= timedelta(seconds=GEOCODE_NEGATIVE_TTL_SECONDS), None
+    if GEOCODE_CACHE_TTL_SECONDS > 0 and age > timedelta(seconds=GEOCODE_CACHE_TTL_SECONDS):
+        return False, None
+    return True, {"lat": entry.lat, "lng": entry.lng}
+
+
+def _upsert(rows: list[dict]):
+    statement = pg_insert(models.GeocodeCache).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[models.GeocodeCache.location_key],
+        set_={"lat": statement.excluded.lat, "lng": statement.excluded.lng, "created_at": func.now()},
+    )
+
+
+def _cache_row(key: str, coordinates: Optional[dict]) -> dict:
+    return {
+        "location_key": key,
+        "lat": coordinates["lat"] if coordinates else None,
+        "lng": coordinates["lng"] if coordinates else None,
+    }
+
+
+def geocode_location(location: str, db: Optional[Session] = None) -> Optional[dict]:
+    """{"lat", "lng"} for a location text, or None. Blocking; uses its own session if none is given."""
+    if not location or not location.strip():
+        return None
+    if db is None:
+        with SessionLocal() as session:
+            return geocode_location(location, session)
+
+    key = location_key(location)
+    usable, coordinates = _from_cache(db.get(models.GeocodeCache, key))
+    if usable:
+        return coordinates
+    api_key = _api_key()
+    if not api_key:
+        return None
+    try:
+        coordinates = _fetch(location, api_key)
+    except GeocodingError as e:
+        print(f"Geocoding error: {e}")
+        return None
+    db.execute(_upsert([_cache_row(key, coordinates)]))
+    db.commit()
+    return coordinates
+
+
+async def geocode_location_async(location: str, db: AsyncSession) -> Optional[dict]:
+    """Async counterpart of `geocode_location`, used by the async endpoints."""
+    if not location or not location.strip():
+        return None
+    key = location_key(location)
+    usable, coordinates = _from_cache(await db.get(models.GeocodeCache, key))
+    if usable:
+        return coordinates
+    api_key = _api_key()
+    if not api_key:
+        return None
+    try:
+        coordinates = await _fetch_async(get_client(), location, api_key)
+    except GeocodingError as e:
+        print(f"Geocoding error: {e}")
+        return None
+    await db.execute(_upsert([_cache_row(key, coordinates)]))
+    await db.commit()
+    return coordinates
+
+
+async def geocode_missing_opportunities(db: AsyncSession, batch_size: int = 500) -> dict:
+    """Sets lat/lng on every opportunity that has a location but no coordinates."""
+    started = time.perf_counter()
+    Opportunity = models.Opportunity
+    missing = (Opportunity.lat == None, Opportunity.location != None, func.btrim(Opportunity.location) != "")
+    total = (await db.execute(select(func.count()).select_from(Opportunity).where(*missing))).scalar()
+    locations = (await db.execute(select(Opportunity.location).where(*missing).distinct())).scalars().all()
+
+    # Different spellings of one place ("Berlin", " berlin") are one lookup
+    texts_by_key = {}
+    for location in locations:
+        texts_by_key.setdefault(location_key(location), location)
+
+    resolved = {}
+    keys = list(texts_by_key)
+    for i in range(0, len(keys), 1000):
+        entries = (await db.execute(
+            select(models.GeocodeCache).where(models.GeocodeCache.location_key.in_(keys[i:i + 1000]))
+        )).scalars().all()
+        for entry in entries:
+            usable, coordinates = _from_cache(entry)
+            if usable:
+                resolved[entry.location_key] = coordinates
+    cache_hits = len(resolved)
+
+    to_fetch = [key for key in keys if key not in resolved]
+    errors = 0
+    api_key = _api_key() if to_fetch else None
+    if api_key:
+        semaphore = asyncio.Semaphore(GEOCODE_CONCURRENCY)
+
+        async def resolve(client, key):
+            async with semaphore:
+                try:
+                    return key, await _fetch_async(client, texts_by_key[key], api_key), None
+                except GeocodingError as e:
+                    return key, None, e
+
+        client = get_client()
+        results = await asyncio.gather(*(resolve(client, key) for key in to_fetch))
+
+        cache_rows = []
+        for key, coordinates, error in results:
+            if error is not None:
+                errors += 1
+                print(f"Geocoding error for {texts_by_key[key]!r}: {error}")
+                continue
+            resolved[key] = coordinates
+            cache_rows.append(_cache_row(key, coordinates))
+        for i in range(0, len(cache_rows), batch_size):
+            await db.execute(_upsert(cache_rows[i:i + batch_size]))
+        await db.commit()
+
+    # One UPDATE ... FROM (VALUES ...) per batch of locations, not one per row
+    found = [
+        (location, resolved[location_key(location)]["lat"], resolved[location_key(location)]["lng"])
+        for location in locations if resolved.get(location_key(location))
+    ]
+    updated = 0
+    for i in range(0, len(found), batch_size):
+        coordinates = values(
+            column("location", Text), column("lat", Float), column("lng", Float), name="geocoded"
+        ).data(found[i:i + batch_size])
+        result = await db.execute(
+            update(Opportunity)
+            .where(Opportunity.location == coordinates.c.location, Opportunity.lat == None)
+            .values(lat=coordinates.c.lat, lng=coordinates.c.lng)
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+        await db.commit()
+
+    return {
+        "message": "Geocoding process completed.",
+        "updated": updated,
+        "skipped": total - updated,
+        "total_processed": total,
+        "locations": len(keys),
+        "cache_hits": cache_hits,
+        "geocoded": sum(1 for key in to_fetch if resolved.get(key)),
+        "not_found": sum(1 for key in to_fetch if key in resolved and resolved[key] is None),
+        "errors": errors,
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
@@ -0,0 +1,86 @@
+"""
+This file implements hybrid (lexical + vector) candidate retrieval for opportunities.
+
+Embeddings find opportunities that are about the same thing as the query, but are
+loose about exact terms: "C++ developer" sits close to "Python developer". The
+full-text side (`opportunities.search_vector`, GIN indexed) matches the actual words
+of the query. Each side returns its own top HYBRID_CANDIDATES_PER_LIST ids, and the
+two rankings are merged with reciprocal rank fusion:
+
+    score(id) = sum over the lists containing id of 1 / (HYBRID_RRF_K + rank)
+
+so an opportunity ranked well by both comes first, and one found by only one side
+still gets in. Everything runs as a single query.
+"""
+from typing import Optional
+
+from sqlalchemy import Text, cast, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import TSQUERY
+
+from . import models
+from .config import HYBRID_CANDIDATES_PER_LIST, HYBRID_RRF_K
+
+TEXT_SEARCH_CONFIG = "english"
+
+
+def text_query(query_text: str):
+    """tsquery matching any of the words of the query (plainto_tsquery ANDs them all)."""
+    return cast(func.replace(cast(func.plainto_tsquery(TEXT_SEARCH_CONFIG, query_text), Text), "&", "|"), TSQUERY)
+
+
+def hybrid_search(
+    candidates,
+    query_text: Optional[str],
+    query_embedding: Optional[list[float]],
+    limit: int,
+    per_list: int = HYBRID_CANDIDATES_PER_LIST,
+    rrf_k: int = HYBRID_RRF_K,
+):
+    """Returns a select of Opportunity rows, best fused score first.
+
+    `candidates` is a select(models.Opportunity) carrying any filters/joins (radius,
+    trust score, ...); both rankings are taken over it. Either the text or the
+    embedding may be missing, in which case only the other ranking is used.
+    """
+    ranked = []
+    if query_embedding:
+        distance = models.Opportunity.embedding.cosine_distance(query_embedding)
+        # ORDER BY distance LIMIT n, so it stays an HNSW index scan
+        ranked.append(
+            candidates.with_only_columns(
+                models.Opportunity.id, func.row_number().over(order_by=distance).label("rank")
+            )
+            .filter(models.Opportunity.embedding.is_not(None))
+            .order_by(distance)
+            .limit(per_list)
+        )
+
+    if query_text and query_text.strip():
+        tsquery = text_query(query_text)
+        rank = func.ts_rank_cd(models.Opportunity.search_vector, tsquery)
+        ranked.append(
+            candidates.with_only_columns(
+                models.Opportunity.id,
+                func.row_number().over(order_by=(rank.desc(), models.Opportunity.id)).label("rank"),
+            )
+            .filter(models.Opportunity.search_vector.op("@@")(tsquery))
+            .order_by(rank.desc(), models.Opportunity.id)
+            .limit(per_list)
+        )
+
+    if not ranked:
+        return candidates.filter(literal(False))
+
+    lists = union_all(*ranked).subquery("ranked")
+    fused = (
+        select(lists.c.id, func.sum(1.0 / (rrf_k + lists.c.rank)).label("score"))
+        .group_by(lists.c.id)
+        .subquery("fused")
+    )
+    # Built from `candidates` so its loader options (e.g. load_only) apply to the result
+    return (
+        candidates
+        .join(fused, fused.c.id == models.Opportunity.id)
+        .order_by(fused.c.score.desc(), models.Opportunity.id)
+        .limit(limit)
+    )
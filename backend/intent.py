@@ -0,0 +1,226 @@
+"""
+This file implements the intent stage of the chat pipeline.
+
+`handle_chat` needs to know whether a message is a request for opportunities
+('OPPORTUNITY') or a general question about the platform ('QUESTION'). Rather than
+spending a Gemini round trip on every message, the stage runs cheap in-process
+classifiers first and only falls back to the LLM when none of them is confident.
+
+The pipeline is async (the chat endpoints are). Classifiers may offer `aclassify`;
+cheap ones like the keyword rules only have a sync `classify`, called inline.
+"""
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Sequence
+
+OPPORTUNITY = "OPPORTUNITY"
+QUESTION = "QUESTION"
+
+
+@dataclass
+class IntentDecision:
+    intent: str
+    confidence: float
+    source: str  # which stage decided: 'keywords', 'centroid', 'gemini' or 'default'
+
+
+# Phrases that almost always mean "find me something".
+_OPPORTUNITY_PATTERNS = [
+    r"\b(jobs?|internships?|gigs?|roles?|positions?|vacanc(y|ies)|openings?|opportunit(y|ies)|missions?)\b",
+    r"\b(hiring|freelance|part[- ]time|full[- ]time|remote work|volunteer(ing)?)\b",
+    r"\b(looking for|find me|show me|searching for|recommend|i want to (learn|work|join|find)|i need a)\b",
+    r"\b(developer|designer|engineer|teacher|tutor|writer|intern|assistant)\b",
+]
+
+# Phrases that point at the platform itself rather than at a listing.
+_QUESTION_PATTERNS = [
+    r"\b(gophora|this (platform|site|website|app))\b",
+    r"\b(what is|what are|how (do|does|can|to)|why|who (is|are|built|made)|tell me about|explain)\b",
+    r"\b(verification|verify|trust score|pricing|plans?|subscription|sign ?up|register|log ?in|account|password)\b",
+    r"^(hi|hello|hey|thanks|thank you)\b",
+]
+
+
+def _count_matches(patterns: Sequence[re.Pattern], text: str) -> int:
+    return sum(1 for pattern in patterns if pattern.search(text))
+
+
+class KeywordIntentClassifier:
+    """Scores a message against the opportunity and question keyword rules."""
+
+    name = "keywords"
+
+    def __init__(self):
+        self._opportunity = [re.compile(p, re.IGNORECASE) for p in _OPPORTUNITY_PATTERNS]
+        self._question = [re.compile(p, re.IGNORECASE) for p in _QUESTION_PATTERNS]
+
+    def classify(self, message: str) -> Optional[IntentDecision]:
+        opportunity_hits = _count_matches(self._opportunity, message)
+        question_hits = _count_matches(self._question, message)
+        if opportunity_hits == question_hits:
+            return None
+        intent = OPPORTUNITY if opportunity_hits > question_hits else QUESTION
+        # A clear margin between the two rule sets is what makes the rules trustworthy.
+        margin = abs(opportunity_hits - question_hits)
+        total = opportunity_hits + question_hits
+        confidence = min(0.95, 0.5 + 0.2 * margin + (0.1 if margin == total else 0.0))
+        return IntentDecision(intent, confidence, self.name)
+
+
+# Small labelled set used to build the centroids. Keep both sides roughly balanced.
+LABELLED_EXAMPLES = {
+    OPPORTUNITY: [
+        "I am looking for a python internship",
+        "Find me a remote web development gig",
+        "Are there any graphic design jobs in Berlin?",
+        "I want to learn pottery",
+        "Show me volunteering opportunities near me",
+        "Any part-time tutoring work for a math student?",
+        "I need a short-term data analysis project",
+        "Recommend something for a React developer",
+    ],
+    QUESTION: [
+        "What is GOPHORA?",
+        "How does provider verification work?",
+        "How is the trust score calculated?",
+        "What subscription plans do you offer?",
+        "How do I reset my password?",
+        "Who built this platform?",
+        "Is my personal data safe here?",
+        "How do I post an opportunity as a provider?",
+    ],
+}
+
+
+def _cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x * x for x in a))
+    norm_b = math.sqrt(sum(y * y for y in b))
+    if not norm_a or not norm_b:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+class CentroidIntentClassifier:
+    """Nearest-centroid classifier over embeddings of `LABELLED_EXAMPLES`.
+
+    `embed` is expected to be cached (see `generate_embedding`), so the centroids cost
+    one embedding call per example once per worker (on a thread, see `centroids`), and
+    each message costs one `async_embed` call that the opportunity branch reuses anyway.
+    """
+
+    name = "centroid"
+
+    def __init__(self, embed: Callable[[str], Optional[list[float]]],
+                 async_embed: Callable[[str], Awaitable[Optional[list[float]]]],
+                 examples: dict = LABELLED_EXAMPLES, retry_after_seconds: float = 60):
+        self._embed = embed
+        self._async_embed = async_embed
+        self._examples = examples
+        self._centroids: Optional[dict] = None
+        self._lock = threading.Lock()
+        self._retry_after_seconds = retry_after_seconds
+        self._last_failure = 0.0
+
+    def _build_centroids(self) -> Optional[dict]:
+        centroids = {}
+        for label, texts in self._examples.items():
+            vectors = [v for v in (self._embed(t) for t in texts) if v]
+            if not vectors:
+                return None
+            centroids[label] = [sum(column) / len(vectors) for column in zip(*vectors)]
+        return centroids
+
+    def centroids(self) -> Optional[dict]:
+        """Returns the centroids, building them if needed.
+
+        Never blocks behind a build that is already running on another thread, and
+        waits `retry_after_seconds` before retrying a build that failed (e.g. Gemini down).
+        """
+        if self._centroids is not None:
+            return self._centroids
+        if time.monotonic() - self._last_failure < self._retry_after_seconds and self._last_failure:
+            return None
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if self._centroids is None:
+                self._centroids = self._build_centroids()
+                if self._centroids is None:
+                    self._last_failure = time.monotonic()
+            return self._centroids
+        finally:
+            self._lock.release()
+
+    async def aclassify(self, message: str) -> Optional[IntentDecision]:
+        centroids = self._centroids
+        if centroids is None:
+            # Never embed the examples on the event loop; build them on a thread and
+            # let this message fall through to the next stage.
+            if not self._lock.locked() and not (
+                self._last_failure and time.monotonic() - self._last_failure < self._retry_after_seconds
+            ):
+                threading.Thread(target=self.centroids, daemon=True).start()
+            return None
+        return self._decide(centroids, await self._async_embed(message))
+
+    def _decide(self, centroids: dict, vector: Optional[list[float]]) -> Optional[IntentDecision]:
+        if not vector:
+            return None
+        scores = {label: _cosine_similarity(vector, centroid) for label, centroid in centroids.items()}
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (best_label, best), (_, runner_up) = ranked[0], ranked[1]
+        # Map the similarity gap onto [0.5, 1.0]; embedding similarities sit close together,
+        # so even a 0.05 gap is a meaningful separation.
+        confidence = min(1.0, 0.5 + (best - runner_up) * 5)
+        return IntentDecision(best_label, confidence, self.name)
+
+
+class IntentPipeline:
+    """Runs the local classifiers in order and asks the LLM only when they are unsure."""
+
+    def __init__(self, classifiers: Sequence, fallback: Optional[Callable[[str], Awaitable[str]]] = None,
+                 threshold: float = 0.7, default: str = QUESTION):
+        self.classifiers = list(classifiers)
+        self.fallback = fallback
+        self.threshold = threshold
+        self.default = default
+
+    async def aclassify(self, message: str) -> IntentDecision:
+        """Classifiers without an `aclassify` method are assumed to be cheap and are called inline."""
+        best: Optional[IntentDecision] = None
+        for classifier in self.classifiers:
+            try:
+                if hasattr(classifier, "aclassify"):
+                    decision = await classifier.aclassify(message)
+                else:
+                    decision = classifier.classify(message)
+            except Exception as e:
+                print(f"Intent classifier '{classifier.name}' failed: {e}")
+                continue
+            if decision is not None and decision.confidence >= self.threshold:
+                return decision
+            best = self._better(best, decision)
+
+        if self.fallback is not None:
+            try:
+                return self._from_llm(await self.fallback(message))
+            except Exception as e:
+                print(f"Intent fallback failed: {e}")
+        return best or IntentDecision(self.default, 0.0, "default")
+
+    @staticmethod
+    def _better(best: Optional[IntentDecision], decision: Optional[IntentDecision]) -> Optional[IntentDecision]:
+        if decision is None:
+            return best
+        if best is None or decision.confidence > best.confidence:
+            return decision
+        return best
+
+    @staticmethod
+    def _from_llm(answer: str) -> IntentDecision:
+        answer = answer.strip().upper()
+        return IntentDecision(OPPORTUNITY if OPPORTUNITY in answer else QUESTION, 1.0, "gemini")
@@ -0,0 +1,192 @@
+"""
+This file implements the knowledge base behind the chat's general-question answers.
+
+Instead of pasting the whole of `context.WEBSITE_CONTEXT` into every prompt, the
+documents are split into chunks, each chunk is embedded once and stored in the
+`kb_chunks` table (pgvector), and a question only gets the few chunks closest to it,
+capped by a token budget.
+
+The index is (re)built at startup and can also be built ahead of time with:
+    python -m backend.knowledge_base
+Only chunks whose text changed are re-embedded, so rebuilding is cheap. A build is
+all or nothing: if embedding fails partway it is rolled back, and `retrieve` returns
+None (the full context) in this process until a build succeeds, rather than answering
+from an index that is missing whole documents.
+
+Besides WEBSITE_CONTEXT, any .md/.txt file in KB_DOCS_DIR is indexed as a document.
+"""
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import context, models
+from .config import KB_DOCS_DIR, KB_CHUNK_CHARS, KB_TOP_K, KB_TOKEN_BUDGET
+
+# "---\nFile: <name>\n---" separates the documents inside WEBSITE_CONTEXT
+_FILE_MARKER_RE = re.compile(r"^---\s*\nFile: (.+)\n---\s*$", re.MULTILINE)
+# Numbered section headings ("3. Functional Requirements") are good places to cut
+_HEADING_RE = re.compile(r"^\d+(\.\d+)*\.?\s+[A-Z]")
+_OVERLAP_LINES = 2
+
+# Whether this process's last build_index call completed; None until one has run
+index_status = {"complete": None}
+
+
+@dataclass
+class Chunk:
+    source: str
+    content: str
+
+    @property
+    def content_hash(self) -> str:
+        return hashlib.sha256(f"{self.source}\n{self.content}".encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for English prose and code
+    return max(1, len(text) // 4)
+
+
+def load_documents() -> list[tuple[str, str]]:
+    """Returns (source, text) pairs for everything the knowledge base should cover."""
+    documents = []
+    parts = _FILE_MARKER_RE.split(context.WEBSITE_CONTEXT)
+    # re.split with one group yields [preamble, name1, body1, name2, body2, ...]
+    if parts[0].strip():
+        documents.append(("WEBSITE_CONTEXT", parts[0].strip()))
+    for name, body in zip(parts[1::2], parts[2::2]):
+        if body.strip():
+            documents.append((os.path.basename(name.strip()), body.strip()))
+
+    if KB_DOCS_DIR and os.path.isdir(KB_DOCS_DIR):
+        for filename in sorted(os.listdir(KB_DOCS_DIR)):
+            if filename.endswith((".md", ".txt")):
+                with open(os.path.join(KB_DOCS_DIR, filename), encoding="utf-8") as f:
+                    documents.append((filename, f.read().strip()))
+    return documents
+
+
+def corpus_hash(documents: Optional[Sequence[tuple[str, str]]] = None) -> str:
+    """A hash of every document, used to invalidate anything derived from them."""
+    digest = hashlib.sha256()
+    for source, text in documents if documents is not None else load_documents():
+        digest.update(source.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def split_into_chunks(source: str, text: str, max_chars: int = KB_CHUNK_CHARS) -> list[Chunk]:
+    """Groups lines into chunks of at most `max_chars`, preferring to cut at headings.
+
+    Consecutive chunks share a couple of lines so a sentence cut at a boundary is
+    still readable in at least one of them.
+    """
+    chunks = []
+    current: list[str] = []
+    size = 0
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line.strip():
+            continue
+        at_heading = bool(_HEADING_RE.match(line)) and size > max_chars // 3
+        if current and (size + len(line) + 1 > max_chars or at_heading):
+            chunks.append(Chunk(source, "\n".join(current)))
+            current = current[-_OVERLAP_LINES:] if not at_heading else []
+            size = sum(len(l) + 1 for l in current)
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append(Chunk(source, "\n".join(current)))
+    return chunks
+
+
+def build_chunks() -> list[Chunk]:
+    return [chunk for source, text in load_documents() for chunk in split_into_chunks(source, text)]
+
+
+def build_index(db: Session, embed_texts: Callable[[list[str]], Optional[list[list[float]]]], batch_size: int = 50) -> dict:
+    """Brings `kb_chunks` in line with the current documents.
+
+    New or changed chunks are embedded in batches; chunks that no longer exist are deleted.
+    If a batch can't be embedded nothing is changed, and the result has `incomplete` set.
+    """
+    chunks = build_chunks()
+    wanted = {chunk.content_hash: chunk for chunk in chunks}
+    existing = set(db.execute(select(models.KnowledgeChunk.content_hash)).scalars())
+
+    stale = existing - wanted.keys()
+    if stale:
+        db.query(models.KnowledgeChunk).filter(
+            models.KnowledgeChunk.content_hash.in_(stale)
+        ).delete(synchronize_session=False)
+
+    missing = [chunk for h, chunk in wanted.items() if h not in existing]
+    embedded = 0
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        vectors = embed_texts([f"Source: {c.source}\n{c.content}" for c in batch])
+        if not vectors:
+            print("Knowledge base: embedding failed, index left unchanged; answers use the full context")
+            db.rollback()
+            index_status["complete"] = False
+            return {"chunks": len(chunks), "embedded": 0, "deleted": 0, "incomplete": True}
+        for chunk, vector in zip(batch, vectors):
+            db.add(models.KnowledgeChunk(
+                source=chunk.source,
+                content=chunk.content,
+                content_hash=chunk.content_hash,
+                token_count=estimate_tokens(chunk.content),
+                embedding=vector,
+            ))
+        embedded += len(batch)
+    db.commit()
+    index_status["complete"] = True
+    return {"chunks": len(chunks), "embedded": embedded, "deleted": len(stale), "incomplete": False}
+
+
+async def retrieve(db: AsyncSession, query_embedding: Optional[list[float]],
+                   top_k: int = KB_TOP_K, token_budget: int = KB_TOKEN_BUDGET) -> Optional[str]:
+    """Returns the most relevant chunks for a question, joined into one context string.
+
+    Chunks are taken in order of similarity until `top_k` or `token_budget` is reached.
+    Returns None when there is no usable index, so callers can fall back to the full context.
+    """
+    if not query_embedding or index_status["complete"] is False:
+        return None
+    try:
+        rows = (await db.execute(
+            select(models.KnowledgeChunk.source, models.KnowledgeChunk.content, models.KnowledgeChunk.token_count)
+            .order_by(models.KnowledgeChunk.embedding.cosine_distance(query_embedding))
+            .limit(top_k)
+        )).all()
+    except Exception as e:
+        print(f"Knowledge base retrieval failed: {e}")
+        await db.rollback()
+        return None
+    if not rows:
+        return None
+
+    selected = []
+    used = 0
+    for row in rows:
+        if selected and used + row.token_count > token_budget:
+            break
+        selected.append(f"[{row.source}]\n{row.content}")
+        used += row.token_count
+    return "\n---\n".join(selected)
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+    from .main import embed_texts
+
+    with SessionLocal() as session:
+        print(build_index(session, embed_texts))
@@ -1,27 +1,35 @@
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session, joinedload
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Text, any_, cast, func, literal, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, array as pg_array, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, load_only, undefer
 from typing import List, Optional
+import asyncio
+import hashlib
+import io
 import json
 import os
 import re
+import tempfile
+import threading
+import time
 import google.generativeai as genai
 from pydantic import BaseModel, Field
-import requests
 
-from . import auth, models, schemas, context
-from .database import SessionLocal, engine
-
-# ADD THIS SNIPPET
-from sqlalchemy import text
-
-# Run the CREATE EXTENSION command before creating tables
-with engine.connect() as connection:
-    connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
-    connection.commit()
-# END OF SNIPPET
-
-models.Base.metadata.create_all(bind=engine)
+from . import auth, models, schemas, context, intent, answer_cache, knowledge_base, backfill, vector_search, geo, bulk_import, password_hashing, gemini_client, geocoding, scraping
+from .hybrid_search import hybrid_search
+from .pagination import PageParams, paginate, NEXT_CURSOR_HEADER
+from .config import EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_TTL_SECONDS, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_DISK_MAX_ENTRIES
+from .config import INTENT_CONFIDENCE_THRESHOLD
+from .config import CHAT_FILTER_CANDIDATES, HYBRID_CANDIDATES_PER_LIST, BULK_IMPORT_MAX_BYTES
+from .database import SessionLocal, AsyncSessionLocal, get_db, get_async_db, pool_metrics
+from .database import current_schema_revision, expected_schema_revision
+from .embedding_cache import EmbeddingCache, normalize_text
+from .geocoding import geocode_location, geocode_location_async
 
 app = FastAPI()
 
@@ -32,15 +40,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets browser clients read the pagination cursor
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # === START: AI Configuration and Helpers ===
 
 # Load API Key and Models from environment
@@ -60,106 +63,292 @@ def _normalize_env(name: Optional[str]) -> Optional[str]:
 GEMINI_CHAT_MODEL_NAME = _normalize_env(os.getenv("GEMINI_CHAT_MODEL", "gemini-1.5-flash-latest"))
 GEMINI_EMBED_MODEL_NAME = _normalize_env(os.getenv("GEMINI_EMBED_MODEL"))
 
+# Repeated queries (and unchanged seeker profiles) hit this instead of Gemini
+embedding_cache = EmbeddingCache(
+    max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+    ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS,
+    disk_path=EMBEDDING_CACHE_PATH,
+    disk_max_entries=EMBEDDING_CACHE_DISK_MAX_ENTRIES,
+)
+
 # Function to generate embeddings for text
 def generate_embedding(text: str) -> list[float] | None:
     """Generates a vector embedding for a given text using Gemini.
 
+    Results are served from `embedding_cache` when the same text was embedded recently.
     Returns None on failure so callers can implement sensible fallbacks.
     """
     if not GEMINI_API_KEY or not GEMINI_EMBED_MODEL_NAME:
         # No model/key configured — bail out to allow tag-based fallback
         print("generate_embedding: GEMINI not configured (key/model missing)")
         return None
+    cached = embedding_cache.get(GEMINI_EMBED_MODEL_NAME, text)
+    if cached is not None:
+        return cached
     try:
         # The client may raise; return None on any error so recommendation flow can fallback
-        result = genai.embed_content(model=GEMINI_EMBED_MODEL_NAME, content=text)
+        result = gemini_client.call(genai.embed_content, model=GEMINI_EMBED_MODEL_NAME, content=text)
         # result may be a dict or object depending on library version
         if isinstance(result, dict) and "embedding" in result:
-            return result["embedding"]
-        # Try attribute access as a fallback
-        return getattr(result, "embedding", None)
+            embedding = result["embedding"]
+        else:
+            # Try attribute access as a fallback
+            embedding = getattr(result, "embedding", None)
+        if embedding:
+            embedding_cache.set(GEMINI_EMBED_MODEL_NAME, text, embedding)
+        return embedding
     except Exception as e:
         print(f"Error generating embedding: {e}")
         return None
 
-def geocode_location(location: str) -> dict:
-    if not location:
+def embed_texts(texts: list[str]) -> list[list[float]] | None:
+    """Embeds many texts with one Gemini request per call. Used by batch jobs.
+
+    Cached texts are not re-sent. Returns None if the batch could not be embedded.
+    """
+    if not GEMINI_API_KEY or not GEMINI_EMBED_MODEL_NAME:
+        print("embed_texts: GEMINI not configured (key/model missing)")
         return None
-    
-    api_key = os.getenv("GEOAPIFY_API_KEY")
-    if not api_key:
-        print("Warning: GEOAPIFY_API_KEY not set. Geocoding will not work.")
+    vectors = [embedding_cache.get(GEMINI_EMBED_MODEL_NAME, t) for t in texts]
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        try:
+            # Batch jobs only (backfill, bulk import, knowledge base): they yield to interactive calls
+            result = gemini_client.call(
+                genai.embed_content, model=GEMINI_EMBED_MODEL_NAME, content=[texts[i] for i in missing],
+                priority=gemini_client.BACKGROUND,
+            )
+            embeddings = result["embedding"] if isinstance(result, dict) else getattr(result, "embedding", None)
+        except Exception as e:
+            print(f"Error generating batch embeddings: {e}")
+            return None
+        if not embeddings or len(embeddings) != len(missing):
+            return None
+        for i, embedding in zip(missing, embeddings):
+            vectors[i] = embedding
+            embedding_cache.set(GEMINI_EMBED_MODEL_NAME, texts[i], embedding)
+    return vectors
+
+# Embedding requests already in flight, so concurrent callers asking for the same
+# text (e.g. the intent stage and the retrieval stage of one chat) share one call.
+_inflight_embeddings: dict = {}
+
+async def generate_embedding_async(text: str) -> list[float] | None:
+    """Async counterpart of `generate_embedding`, used by the async endpoints."""
+    if not GEMINI_API_KEY or not GEMINI_EMBED_MODEL_NAME:
+        print("generate_embedding: GEMINI not configured (key/model missing)")
         return None
-
+    cached = await embedding_cache.aget(GEMINI_EMBED_MODEL_NAME, text)
+    if cached is not None:
+        return cached
+
+    key = (GEMINI_EMBED_MODEL_NAME, normalize_text(text))
+    task = _inflight_embeddings.get(key)
+    if task is None:
+        task = asyncio.create_task(_embed_with_gemini_async(text))
+        _inflight_embeddings[key] = task
+        task.add_done_callback(lambda _: _inflight_embeddings.pop(key, None))
+    # Shield so that one caller being cancelled doesn't cancel the shared request
+    return await asyncio.shield(task)
+
+async def _embed_with_gemini_async(text: str) -> list[float] | None:
+    """Returns None on failure like `generate_embedding`, except GeminiBusy, which is raised
+    so that endpoints can answer 503 (see `gemini_http_error`) rather than fail the request."""
     try:
-        response = requests.get(f"https://api.geoapify.com/v1/geocode/search?text={location}&apiKey={api_key}")
-        response.raise_for_status()
-        data = response.json()
-        if data and data["features"]:
-            # Geoapify returns lng, lat order
-            lng, lat = data["features"][0]["geometry"]["coordinates"]
-            return {"lat": lat, "lng": lng}
-    except requests.RequestException as e:
-        print(f"Geocoding error: {e}")
-    return None
+        result = await gemini_client.call_async(genai.embed_content_async, model=GEMINI_EMBED_MODEL_NAME, content=text)
+        if isinstance(result, dict) and "embedding" in result:
+            embedding = result["embedding"]
+        else:
+            embedding = getattr(result, "embedding", None)
+        if embedding:
+            await embedding_cache.aset(GEMINI_EMBED_MODEL_NAME, text, embedding)
+        return embedding
+    except gemini_client.GeminiBusy:
+        raise
+    except Exception as e:
+        print(f"Error generating embedding: {e}")
+        return None
 
+async def generate_embedding_or_none(text: str) -> list[float] | None:
+    """`generate_embedding_async` for callers that have a fallback: None when Gemini is busy too."""
+    try:
+        return await generate_embedding_async(text)
+    except gemini_client.GeminiBusy as e:
+        print(f"Skipping embedding: {e}")
+        return None
 
-@app.post("/api/admin/re-geocode-opportunities")
-def re_geocode_opportunities(db: Session = Depends(get_db)):
+def seeker_profile_text(profile: models.Profile) -> Optional[str]:
+    """The text a seeker's profile embedding is computed from. None if there are no skills."""
+    if not profile or not profile.skills:
+        return None
+    text_to_embed = f"A job seeker with skills in: {', '.join(profile.skills)}"
+    if profile.interests:
+        text_to_embed += f"\nInterests: {', '.join(profile.interests)}"
+    if profile.bio:
+        text_to_embed += f"\nBio: {profile.bio}"
+    return text_to_embed
+
+def _text_hash(text_to_hash: str) -> str:
+    return hashlib.sha256(text_to_hash.encode("utf-8")).hexdigest()
+
+def profile_embedding_is_current(profile: models.Profile) -> bool:
+    text_to_embed = seeker_profile_text(profile)
+    # The hash is only ever set together with the embedding, so the (deferred) vector itself isn't loaded
+    return bool(text_to_embed) and profile.embedding_hash == _text_hash(text_to_embed)
+
+def refresh_profile_embedding(profile: models.Profile):
+    """Recomputes the stored profile embedding, but only if skills/interests/bio changed."""
+    text_to_embed = seeker_profile_text(profile)
+    if not text_to_embed:
+        profile.embedding = None
+        profile.embedding_hash = None
+        return
+    if profile_embedding_is_current(profile):
+        return
+    embedding_vector = generate_embedding(text_to_embed)
+    if embedding_vector:
+        profile.embedding = embedding_vector
+        profile.embedding_hash = _text_hash(text_to_embed)
+
+async def refresh_profile_embedding_async(profile: models.Profile):
+    """Async counterpart of `refresh_profile_embedding`, for the async endpoints."""
+    text_to_embed = seeker_profile_text(profile)
+    if not text_to_embed:
+        profile.embedding = None
+        profile.embedding_hash = None
+        return
+    if profile_embedding_is_current(profile):
+        return
+    embedding_vector = await generate_embedding_or_none(text_to_embed)
+    if embedding_vector:
+        profile.embedding = embedding_vector
+        profile.embedding_hash = _text_hash(text_to_embed)
+
+@app.post("/api/admin/re-geocode-opportunities", dependencies=[Depends(auth.require_admin)])
+async def re_geocode_opportunities(db: AsyncSession = Depends(get_async_db)):
     """
     Finds all opportunities without lat/lng and attempts to geocode their location.
-    This is useful for fixing old data.
+    This is useful for fixing old data. Each distinct location is looked up once
+    (see geocoding.py), most of them usually straight from the geocode cache.
+    """
+    return await geocoding.geocode_missing_opportunities(db)
+
+@app.post("/api/admin/backfill-embeddings", dependencies=[Depends(auth.require_admin)])
+def backfill_embeddings(batch_size: int = 100, max_batches: Optional[int] = 10, restart: bool = False, db: Session = Depends(get_db)):
+    """
+    Embeds opportunities that were stored without an embedding (e.g. Gemini was down).
+    Work is bounded by max_batches; call again to continue from the saved checkpoint.
+    """
+    return backfill.backfill_opportunity_embeddings(
+        db, embed_texts, batch_size=batch_size, max_batches=max_batches, restart=restart
+    )
+
+@app.get("/api/admin/metrics", dependencies=[Depends(auth.require_admin)])
+def get_metrics():
+    """
+    Returns in-process counters (cache hit rates etc.) for this worker.
     """
-    # Find opportunities where coordinates are missing but a location string exists
-    ops_to_fix = db.query(models.Opportunity).filter(
-        models.Opportunity.lat == None,
-        models.Opportunity.location != None
-    ).all()
-    
-    updated_count = 0
-    skipped_count = 0
-
-    for opp in ops_to_fix:
-        location_coords = geocode_location(opp.location)
-        if location_coords:
-            opp.lat = location_coords.get("lat")
-            opp.lng = location_coords.get("lng")
-            db.add(opp)
-            updated_count += 1
-        else:
-            skipped_count += 1
-            
-    db.commit()
-    
     return {
-        "message": "Geocoding process completed.",
-        "updated": updated_count,
-        "skipped": skipped_count,
-        "total_processed": len(ops_to_fix)
+        "embedding_cache": embedding_cache.stats(),
+        "answer_cache": dict(answer_cache.stats),
+        "db_pool": pool_metrics(),
+        "principal_cache": auth.principal_cache.stats(),
+        "password_hashing": password_hashing.pool.stats(),
+        "gemini": gemini_client.limiter.stats(),
+        "scraping": dict(scraping.stats),
     }
 
+def gemini_http_error(error: Exception, detail: str) -> HTTPException:
+    """The HTTP error for a failed Gemini call: 503 (retry later) when Gemini is at capacity, else 500.
+
+    The error itself is only logged; clients get `detail`.
+    """
+    if isinstance(error, gemini_client.GeminiBusy):
+        return HTTPException(status_code=503, detail=f"{detail}: the AI service is busy, please retry shortly", headers={"Retry-After": "5"})
+    print(f"{detail}: {error!r}")
+    return HTTPException(status_code=500, detail=detail)
+
+async def require_query_embedding(embedding) -> list[float]:
+    """Awaits the embedding of a search query, for endpoints that can't answer without one."""
+    try:
+        query_embedding = await embedding
+    except gemini_client.GeminiBusy as e:
+        raise gemini_http_error(e, "Could not generate query embedding")
+    if not query_embedding:
+        raise HTTPException(status_code=500, detail="Could not generate query embedding.")
+    return query_embedding
+
 # === END: AI Configuration and Helpers ===
 
 
+@app.get("/api/health/live")
+def liveness():
+    """Liveness probe: the process is up and serving. Never touches the database."""
+    return {"status": "ok"}
+
+@app.get("/api/health/ready")
+async def readiness(db: AsyncSession = Depends(get_async_db)):
+    """
+    Readiness probe: the database is reachable and migrated to the revision this code
+    expects (`alembic upgrade head`). Returns 503 otherwise.
+    """
+    expected = expected_schema_revision()
+    try:
+        await db.execute(text("SELECT 1"))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail={"database": "unreachable", "error": str(e)})
+    current = await current_schema_revision(db)
+    if current != expected:
+        raise HTTPException(status_code=503, detail={"database": "ok", "schema": current, "expected_schema": expected})
+    return {"status": "ready", "schema": current}
+
+
 @app.get("/api/debug/users", response_model=List[schemas.User])
-def get_all_users(db: Session = Depends(get_db)):
-    return db.query(models.User).all()
+def get_all_users(response: Response, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    return paginate(db.query(models.User), models.User, page, response)
 
 @app.get("/api/debug/opportunities", response_model=List[schemas.Opportunity])
-def get_all_opportunities(db: Session = Depends(get_db)):
-    return db.query(models.Opportunity).all()
+def get_all_opportunities(response: Response, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    return paginate(db.query(models.Opportunity).options(opportunity_response_fields), models.Opportunity, page, response)
+
+
+# The columns schemas.Opportunity returns. List and candidate queries load only these,
+# so the embedding, tag_keys and search_vector never leave the database for them.
+OPPORTUNITY_RESPONSE_COLUMNS = [getattr(models.Opportunity, name) for name in schemas.Opportunity.model_fields]
+opportunity_response_fields = load_only(*OPPORTUNITY_RESPONSE_COLUMNS)
+
+
+def filter_opportunities(
+    query,
+    opportunity_type: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    location: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+):
+    """Applies the optional listing filters. Each one has a matching (column, created_at, id) index."""
+    if opportunity_type:
+        query = query.filter(models.Opportunity.type == opportunity_type)
+    if status_filter:
+        query = query.filter(models.Opportunity.status == status_filter)
+    if location:
+        query = query.filter(models.Opportunity.location == location)
+    if tags:
+        # Matches opportunities that have at least one of the tags (case-insensitive)
+        query = query.filter(models.Opportunity.tag_keys.overlap(models.normalize_tags(tags)))
+    return query
 
 
 
 # In main.py
 
 @app.post("/api/auth/register", response_model=schemas.User)
-def register_user(user_data: schemas.RegisterRequest, db: Session = Depends(get_db)):
-    db_user = auth.get_user(db, email=user_data.email)
+async def register_user(user_data: schemas.RegisterRequest, db: AsyncSession = Depends(get_async_db)):
+    # Async like login: the Argon2 hash is awaited on the password pool, not run on FastAPI's threads
+    db_user = (await db.execute(select(models.User).filter(models.User.email == user_data.email))).scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = auth.get_password_hash(user_data.password)
+    hashed_password = await password_hashing.hash_password_async(user_data.password)
     
     # --- START OF FIX ---
     
@@ -175,10 +364,10 @@ def register_user(user_data: schemas.RegisterRequest, db: Session = Depends(get_
     # 2. Commit the user to generate its ID
     # This is necessary before creating the profile which depends on the user's ID.
     try:
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating user: {e}")
 
     # 3. Create the profile object with the now-valid user ID
@@ -194,17 +383,19 @@ def register_user(user_data: schemas.RegisterRequest, db: Session = Depends(get_
         profile_data["company_website"] = user_data.website
     
     db_profile = models.Profile(user_id=db_user.id, **profile_data)
+    if user_data.role == "seeker":
+        await refresh_profile_embedding_async(db_profile)
     db.add(db_profile)
     
     # 4. Commit the profile
     try:
-        db.commit()
-        db.refresh(db_user) # Refresh to load the full user object with its profile relationship
+        await db.commit()
+        await db.refresh(db_user) # Refresh to load the full user object with its profile relationship
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         # Optionally, delete the user that was created in the first step to clean up
-        db.delete(db_user)
-        db.commit()
+        await db.delete(db_user)
+        await db.commit()
         raise HTTPException(status_code=500, detail=f"Error creating profile: {e}")
         
     # --- END OF FIX ---
@@ -212,9 +403,13 @@ def register_user(user_data: schemas.RegisterRequest, db: Session = Depends(get_
     return db_user
 
 @app.post("/api/auth/login", response_model=schemas.Token)
-def login_for_access_token(form_data: schemas.LoginRequest, db: Session = Depends(get_db)):
-    user = auth.get_user(db, email=form_data.username)
-    if not user or not auth.verify_password(form_data.password, user.password_hash):
+async def login_for_access_token(form_data: schemas.LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    # Async so that a login burst waits on the password pool, not on FastAPI's threads
+    user = (await db.execute(select(models.User).filter(models.User.email == form_data.username))).scalars().first()
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await password_hashing.verify_and_update(form_data.password, user.password_hash)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -225,17 +420,19 @@ def login_for_access_token(form_data: schemas.LoginRequest, db: Session = Depend
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"You are a {user.role} and cannot log in as a {form_data.role}",
         )
-    access_token = auth.create_access_token(
-        data={"sub": user.email, "role": user.role}
-    )
+    if new_hash:
+        # Hashed with older Argon2 parameters: store it with the current ones
+        user.password_hash = new_hash
+        await db.commit()
+    access_token = auth.create_access_token(data=auth.user_token_claims(user))
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/api/users/me", response_model=schemas.User)
-def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
+def read_users_me(current_user: schemas.User = Depends(auth.get_current_user)):
     return current_user
 
 @app.get("/api/profiles/me", response_model=schemas.Profile)
-def read_user_profile(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def read_user_profile(current_user: schemas.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     profile = db.query(models.Profile).filter(models.Profile.user_id == current_user.id).first()
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
@@ -244,7 +441,7 @@ def read_user_profile(current_user: models.User = Depends(auth.get_current_user)
 @app.put("/api/profiles/me", response_model=schemas.Profile)
 def update_user_profile(
     profile_update: schemas.ProfileBase,
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.User = Depends(auth.get_current_user),
     db: Session = Depends(get_db),
 ):
     profile = db.query(models.Profile).filter(models.Profile.user_id == current_user.id).first()
@@ -255,23 +452,28 @@ def update_user_profile(
         update_data = profile_update.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(profile, key, value)
+    if current_user.role == "seeker":
+        # No-op unless skills, interests or bio actually changed
+        refresh_profile_embedding(profile)
     db.commit()
     db.refresh(profile)
+    # Cached principals are snapshots; don't serve one from before this edit
+    auth.invalidate_principal(current_user.id)
     return profile
 
 @app.post("/api/opportunities", response_model=schemas.Opportunity)
-def create_opportunity(
+async def create_opportunity(
     opportunity: schemas.OpportunityCreate, # <-- CRITICAL FIX: Use OpportunityCreate
-    current_user: models.User = Depends(auth.get_current_active_provider),
-    db: Session = Depends(get_db),
+    current_user: schemas.Principal = Depends(auth.get_current_active_provider),
+    db: AsyncSession = Depends(get_async_db),
 ):
     
-    # Generate the embedding
-    text_to_embed = f"Title: {opportunity.title}\nDescription: {opportunity.description}\nTags: {', '.join(opportunity.tags)}"
-    embedding_vector = generate_embedding(text_to_embed)
-
-    # Geocode the location
-    location_coords = geocode_location(opportunity.location)
+    # Generate the embedding and geocode the location concurrently
+    text_to_embed = backfill.opportunity_embedding_text(opportunity.title, opportunity.description, opportunity.tags)
+    embedding_vector, location_coords = await asyncio.gather(
+        generate_embedding_or_none(text_to_embed),
+        geocode_location_async(opportunity.location, db),
+    )
     lat = location_coords["lat"] if location_coords else None
     lng = location_coords["lng"] if location_coords else None
 
@@ -291,78 +493,242 @@ def create_opportunity(
     )
     
     db.add(db_opportunity)
-    db.commit()
-    db.refresh(db_opportunity)
+    await db.commit()
+    await db.refresh(db_opportunity)
     return db_opportunity
 
+@app.post("/api/opportunities/bulk")
+async def bulk_import_opportunities(
+    request: Request,
+    import_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(bulk_import.MAX_BATCH_SIZE, ge=1, le=bulk_import.MAX_BATCH_SIZE),
+    current_user: schemas.Principal = Depends(auth.get_current_active_provider),
+):
+    """
+    Imports many opportunities at once from the request body: CSV (Content-Type text/csv)
+    or NDJSON (application/x-ndjson), or say which with ?format=. Runs bulk_import.py;
+    returns the counts and the per-row errors instead of failing on the first bad row.
+    """
+    fmt = import_format or bulk_import.detect_format(content_type=request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson")
+
+    # Spooled to disk past 1 MB, so a large upload is never held in memory whole
+    upload = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > BULK_IMPORT_MAX_BYTES:
+            upload.close()
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Upload is larger than {BULK_IMPORT_MAX_BYTES} bytes")
+        upload.write(chunk)
+    upload.seek(0)
+
+    def run_import():
+        with upload, io.TextIOWrapper(upload, encoding="utf-8-sig", errors="replace", newline="") as lines, SessionLocal() as db:
+            return bulk_import.import_opportunities(
+                db, lines, fmt, current_user.id, embed_texts, geocode_location, batch_size=batch_size
+            )
+
+    # The import itself is blocking (sync session, batched Gemini and Geoapify calls)
+    try:
+        return await run_in_threadpool(run_import)
+    except bulk_import.MalformedInputError as e:
+        # Unparseable from this line on; the rows before it were imported and are reported
+        raise HTTPException(status_code=400, detail={"error": str(e), "line": e.line_number, "imported": e.report})
+
 # ... (all your other endpoints like apply, get applications, etc. remain the same)
 @app.get("/api/applications/me", response_model=List[schemas.ApplicationWithOpportunity])
-def read_seeker_applications(current_user: models.User = Depends(auth.get_current_active_seeker), db: Session = Depends(get_db)):
-    return db.query(models.Application).filter(models.Application.seeker_id == current_user.id).options(joinedload(models.Application.opportunity)).all()
+def read_seeker_applications(current_user: schemas.Principal = Depends(auth.get_current_active_seeker), db: Session = Depends(get_db)):
+    return db.query(models.Application).filter(models.Application.seeker_id == current_user.id).options(
+        joinedload(models.Application.opportunity).load_only(*OPPORTUNITY_RESPONSE_COLUMNS)
+    ).all()
 
 @app.post("/api/applications/apply", response_model=schemas.Application)
-def apply_for_opportunity(opportunity_id: int, cover_letter: Optional[str] = None, current_user: models.User = Depends(auth.get_current_active_seeker), db: Session = Depends(get_db)):
-    opportunity = db.query(models.Opportunity).filter(models.Opportunity.id == opportunity_id).first()
-    if not opportunity:
-        raise HTTPException(status_code=404, detail="Opportunity not found")
-    existing_application = db.query(models.Application).filter(models.Application.seeker_id == current_user.id, models.Application.opportunity_id == opportunity_id).first()
-    if existing_application:
-        raise HTTPException(status_code=400, detail="Already applied to this opportunity")
-    db_application = models.Application(seeker_id=current_user.id, opportunity_id=opportunity_id, cover_letter=cover_letter)
-    db.add(db_application)
+def apply_for_opportunity(opportunity_id: int, cover_letter: Optional[str] = None, current_user: schemas.Principal = Depends(auth.get_current_active_seeker), db: Session = Depends(get_db)):
+    """
+    One statement: INSERT ... SELECT from opportunities (so nothing is inserted for an
+    opportunity that doesn't exist) ON CONFLICT DO NOTHING on the seeker/opportunity
+    unique constraint, RETURNING the new row. Concurrent duplicate applies can't both
+    succeed, and the database is only asked why nothing was inserted when nothing was.
+    """
+    Application = models.Application
+    insert_application = (
+        pg_insert(Application)
+        .from_select(
+            ["seeker_id", "opportunity_id", "cover_letter", "status"],
+            select(
+                literal(current_user.id), models.Opportunity.id, literal(cover_letter, Text), literal("pending")
+            ).where(models.Opportunity.id == opportunity_id),
+        )
+        .on_conflict_do_nothing(constraint="uq_applications_seeker_id_opportunity_id")
+        .returning(Application.id, Application.seeker_id, Application.opportunity_id, Application.status, Application.cover_letter, Application.submitted_at)
+    )
+    application = db.execute(insert_application).mappings().first()
     db.commit()
-    db.refresh(db_application)
-    return db_application
+    if application:
+        return application
+    if db.query(models.Opportunity.id).filter(models.Opportunity.id == opportunity_id).first() is None:
+        raise HTTPException(status_code=404, detail="Opportunity not found")
+    raise HTTPException(status_code=400, detail="Already applied to this opportunity")
 
 @app.get("/api/opportunities/me", response_model=List[schemas.Opportunity])
-def read_provider_opportunities(current_user: models.User = Depends(auth.get_current_active_provider), db: Session = Depends(get_db)):
-    return db.query(models.Opportunity).filter(models.Opportunity.provider_id == current_user.id).all()
+def read_provider_opportunities(
+    response: Response,
+    page: PageParams = Depends(),
+    opportunity_type: Optional[str] = Query(None, alias="type"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    current_user: schemas.Principal = Depends(auth.get_current_active_provider),
+    db: Session = Depends(get_db),
+):
+    query = db.query(models.Opportunity).options(opportunity_response_fields).filter(models.Opportunity.provider_id == current_user.id)
+    query = filter_opportunities(query, opportunity_type, status_filter)
+    return paginate(query, models.Opportunity, page, response)
+
+@app.get("/api/opportunities/me/summary", response_model=List[schemas.OpportunitySummary])
+def read_provider_opportunity_summary(
+    response: Response,
+    page: PageParams = Depends(),
+    opportunity_type: Optional[str] = Query(None, alias="type"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    current_user: schemas.Principal = Depends(auth.get_current_active_provider),
+    db: Session = Depends(get_db),
+):
+    """
+    The provider's opportunities (paginated like /api/opportunities/me), each with its
+    application counts by status and the time of the latest application.
+    """
+    application_status = models.Application.status
+    # Counting opportunity_id (NULL when there are no applications) rather than id keeps every
+    # column the query needs in ix_applications_opportunity_id_status
+    applications = func.count(models.Application.opportunity_id)
+    query = (
+        db.query(
+            *OPPORTUNITY_RESPONSE_COLUMNS,
+            applications.label("application_count"),
+            applications.filter(application_status == "pending").label("pending_count"),
+            applications.filter(application_status == "accepted").label("accepted_count"),
+            applications.filter(application_status == "rejected").label("rejected_count"),
+            func.max(models.Application.submitted_at).label("latest_application_at"),
+        )
+        .outerjoin(models.Application, models.Application.opportunity_id == models.Opportunity.id)
+        .filter(models.Opportunity.provider_id == current_user.id)
+        .group_by(models.Opportunity.id)
+    )
+    query = filter_opportunities(query, opportunity_type, status_filter)
+    return paginate(query, models.Opportunity, page, response)
 
 @app.get("/api/opportunities", response_model=List[schemas.Opportunity])
-def read_opportunities(db: Session = Depends(get_db)):
-    return db.query(models.Opportunity).all()
+def read_opportunities(
+    response: Response,
+    page: PageParams = Depends(),
+    opportunity_type: Optional[str] = Query(None, alias="type"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    location: Optional[str] = None,
+    tags: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Lists opportunities newest first, one page at a time.
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page.
+    """
+    query = filter_opportunities(db.query(models.Opportunity).options(opportunity_response_fields), opportunity_type, status_filter, location, tags)
+    return paginate(query, models.Opportunity, page, response)
+
+@app.get("/api/opportunities/nearby", response_model=List[schemas.NearbyOpportunity])
+def read_nearby_opportunities(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(25.0, gt=0, le=geo.MAX_RADIUS_KM),
+    limit: int = Query(50, ge=1, le=100),
+    opportunity_type: Optional[str] = Query(None, alias="type"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    tags: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Lists opportunities within `radius_km` of (lat, lng), nearest first.
+    Opportunities that could not be geocoded have no coordinates and never match.
+    """
+    distance = geo.distance_km(lat, lng).label("distance_km")
+    query = db.query(models.Opportunity, distance).options(opportunity_response_fields).filter(geo.within_radius(lat, lng, radius_km))
+    query = filter_opportunities(query, opportunity_type, status_filter, tags=tags)
+    rows = query.order_by(distance, models.Opportunity.id).limit(limit).all()
+    return [
+        schemas.NearbyOpportunity(**schemas.Opportunity.model_validate(opp).model_dump(), distance_km=round(distance_km, 3))
+        for opp, distance_km in rows
+    ]
 
 @app.get("/api/opportunities/recommend", response_model=List[schemas.Opportunity])
-def get_recommendations_for_seeker(
-    current_user: models.User = Depends(auth.get_current_active_seeker),
-    db: Session = Depends(get_db),
+async def get_recommendations_for_seeker(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=geo.MAX_RADIUS_KM),
+    current_user: schemas.Principal = Depends(auth.get_current_active_seeker),
+    db: AsyncSession = Depends(get_async_db),
 ):
+    # Optional "near me" constraint, applied to every candidate query below
+    near = geo.radius_filter(lat, lng, radius_km)
+    candidates = select(models.Opportunity).options(opportunity_response_fields)
+    if near is not None:
+        candidates = candidates.filter(near)
+    recent_opportunities = candidates.order_by(models.Opportunity.created_at.desc()).limit(10)
+
     # 1. Get Seeker's Profile and Skills
-    profile = db.query(models.Profile).filter(models.Profile.user_id == current_user.id).first()
+    profile = (await db.execute(
+        select(models.Profile).options(undefer(models.Profile.embedding)).filter(models.Profile.user_id == current_user.id)
+    )).scalars().first()
     
     if not profile or not profile.skills:
         # If no profile or no skills, just return the 10 most recent jobs
-        return db.query(models.Opportunity).order_by(models.Opportunity.created_at.desc()).limit(10).all()
+        return (await db.execute(recent_opportunities)).scalars().all()
 
     seeker_skills = profile.skills
-    seeker_query = f"A job seeker with skills in: {', '.join(seeker_skills)}"
+    seeker_query = seeker_profile_text(profile)
 
-    # 2. Retrieve: Try semantic search via embeddings; if unavailable, fallback to tag overlap
-    query_embedding = generate_embedding(seeker_query)
+    # 2. Retrieve: Try semantic search via the stored profile embedding (computed when the
+    # profile last changed); if unavailable, fallback to tag overlap
+    if profile_embedding_is_current(profile):
+        query_embedding = profile.embedding
+    else:
+        # Profiles from before embeddings were stored: compute once and keep it
+        query_embedding = await generate_embedding_or_none(seeker_query)
+        if query_embedding:
+            profile.embedding = query_embedding
+            profile.embedding_hash = _text_hash(seeker_query)
+            await db.commit()
     similar_opportunities = []
+    trusted_opportunities = candidates.join(models.Opportunity.provider).join(models.User.profile).filter(models.Profile.trust_score >= 40)
 
     if query_embedding:
         try:
-            # Get a larger list of candidates by semantic similarity
-            similar_opportunities = db.query(models.Opportunity).join(models.Opportunity.provider).join(models.User.profile).filter(models.Profile.trust_score >= 40).order_by(
-                models.Opportunity.embedding.cosine_distance(query_embedding)
-            ).limit(20).all()
+            # Get a larger list of candidates by semantic similarity, fused with full-text matches
+            await vector_search.use_ef_search(db, limit=HYBRID_CANDIDATES_PER_LIST, filtered=True)
+            similar_opportunities = (await db.execute(
+                hybrid_search(trusted_opportunities, seeker_query, query_embedding, limit=20)
+            )).scalars().all()
         except Exception as e:
             print(f"Error during semantic DB query: {e}")
+            await db.rollback()
 
     if not similar_opportunities:
-        # Fallback: simple tag/skill overlap scoring
-        seeker_set = set([s.lower() for s in seeker_skills])
-        candidates = db.query(models.Opportunity).join(models.Opportunity.provider).join(models.User.profile).filter(models.Profile.trust_score >= 40).all()
-        scored = []
-        for opp in candidates:
-            opp_tags = [t.lower() for t in (opp.tags or [])]
-            overlap = len(seeker_set.intersection(opp_tags))
-            if overlap > 0:
-                scored.append((overlap, opp))
-        # sort by overlap desc, then by created_at desc
-        scored.sort(key=lambda x: (-x[0], getattr(x[1], 'created_at', None)), )
-        similar_opportunities = [opp for score, opp in scored][:20]
+        # Fallback: tag/skill overlap scoring, done in Postgres. `&&` uses the GIN index on
+        # tag_keys, and the score is the number of the seeker's skills among the tags.
+        seeker_tags = models.normalize_tags(seeker_skills)
+        seeker_array = cast(pg_array(seeker_tags), ARRAY(Text))
+        opportunity_tag = func.unnest(models.Opportunity.tag_keys).table_valued("tag").render_derived()
+        overlap = (
+            select(func.count())
+            .select_from(opportunity_tag)
+            .where(opportunity_tag.c.tag == any_(seeker_array))
+            .scalar_subquery()
+        )
+        similar_opportunities = (await db.execute(
+            trusted_opportunities
+            .filter(models.Opportunity.tag_keys.overlap(seeker_array))
+            .order_by(overlap.desc(), models.Opportunity.created_at.desc())
+            .limit(20)
+        )).scalars().all()
 
     if not similar_opportunities:
         return [] # Return an empty list if no matches are found
@@ -396,10 +762,11 @@ def get_recommendations_for_seeker(
             GEMINI_CHAT_MODEL_NAME,
             generation_config={"response_mime_type": "application/json"}
         )
-        ai_json_response = filter_model.generate_content(
+        ai_json_response = (await gemini_client.call_async(
+            filter_model.generate_content_async,
             [filter_prompt],
             generation_config={"response_schema": AIFilterResponse}
-        ).text
+        )).text
         
         ai_data = json.loads(ai_json_response)
         relevant_ids = ai_data.get("relevant_ids", [])
@@ -408,27 +775,27 @@ def get_recommendations_for_seeker(
         if not relevant_ids:
             return [] # Return empty list if AI filtered everything out
 
-        final_opportunities = db.query(models.Opportunity).filter(
-            models.Opportunity.id.in_(relevant_ids)
-        ).all()
+        final_opportunities = (await db.execute(
+            select(models.Opportunity).options(opportunity_response_fields).filter(models.Opportunity.id.in_(relevant_ids))
+        )).scalars().all()
         
         return final_opportunities
         
     except Exception as e:
         print(f"Error in recommendation endpoint: {str(e)}")
         # Fallback: just return the 10 most recent jobs on error
-        return db.query(models.Opportunity).order_by(models.Opportunity.created_at.desc()).limit(10).all()
+        return (await db.execute(recent_opportunities)).scalars().all()
 
 
 @app.get("/api/opportunities/{opportunity_id}", response_model=schemas.Opportunity)
 def read_opportunity(opportunity_id: int, db: Session = Depends(get_db)):
-    db_opportunity = db.query(models.Opportunity).filter(models.Opportunity.id == opportunity_id).first()
+    db_opportunity = db.query(models.Opportunity).options(opportunity_response_fields).filter(models.Opportunity.id == opportunity_id).first()
     if db_opportunity is None:
         raise HTTPException(status_code=404, detail="Opportunity not found")
     return db_opportunity
 
 @app.put("/api/opportunities/{opportunity_id}", response_model=schemas.Opportunity)
-def update_opportunity(opportunity_id: int, opportunity_update: schemas.OpportunityBase, current_user: models.User = Depends(auth.get_current_active_provider), db: Session = Depends(get_db)):
+def update_opportunity(opportunity_id: int, opportunity_update: schemas.OpportunityBase, current_user: schemas.Principal = Depends(auth.get_current_active_provider), db: Session = Depends(get_db)):
     db_opportunity = db.query(models.Opportunity).filter(models.Opportunity.id == opportunity_id).first()
     if db_opportunity is None:
         raise HTTPException(status_code=404, detail="Opportunity not found")
@@ -444,7 +811,7 @@ def update_opportunity(opportunity_id: int, opportunity_update: schemas.Opportun
     return db_opportunity
 
 @app.delete("/api/opportunities/{opportunity_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_opportunity(opportunity_id: int, current_user: models.User = Depends(auth.get_current_active_provider), db: Session = Depends(get_db)):
+def delete_opportunity(opportunity_id: int, current_user: schemas.Principal = Depends(auth.get_current_active_provider), db: Session = Depends(get_db)):
     db_opportunity = db.query(models.Opportunity).filter(models.Opportunity.id == opportunity_id).first()
     if db_opportunity is None:
         raise HTTPException(status_code=404, detail="Opportunity not found")
@@ -455,7 +822,7 @@ def delete_opportunity(opportunity_id: int, current_user: models.User = Depends(
     return
 
 @app.get("/api/opportunities/{opportunity_id}/applications", response_model=List[schemas.Application])
-def get_applications_for_opportunity(opportunity_id: int, current_user: models.User = Depends(auth.get_current_active_provider), db: Session = Depends(get_db)):
+def get_applications_for_opportunity(opportunity_id: int, current_user: schemas.Principal = Depends(auth.get_current_active_provider), db: Session = Depends(get_db)):
     opportunity = db.query(models.Opportunity).filter(models.Opportunity.id == opportunity_id, models.Opportunity.provider_id == current_user.id).first()
     if not opportunity:
         raise HTTPException(status_code=404, detail="Opportunity not found or not owned by current provider")
@@ -464,16 +831,19 @@ def get_applications_for_opportunity(opportunity_id: int, current_user: models.U
 
 # === NEW ENDPOINT: AI-Powered Recommendations ===
 @app.post("/api/chat/recommend", response_model=schemas.ChatResponse)
-def recommend_opportunities(chat_request: schemas.ChatRequest, db: Session = Depends(get_db)):
+async def recommend_opportunities(chat_request: schemas.ChatRequest, db: AsyncSession = Depends(get_async_db)):
     # 1. Retrieve: Find relevant opportunities using vector search
-    query_embedding = generate_embedding(chat_request.message)
-    if not query_embedding:
-        raise HTTPException(status_code=500, detail="Could not generate query embedding.")
-
-    # Find the top 3 most relevant opportunities using cosine distance (<=>)
-    similar_opportunities = db.query(models.Opportunity).order_by(
-        models.Opportunity.embedding.cosine_distance(query_embedding)
-    ).limit(3).all()
+    query_embedding = await require_query_embedding(generate_embedding_async(chat_request.message))
+
+    # Find the top 3 most relevant opportunities: cosine distance (<=>) fused with full-text rank
+    near = geo.radius_filter(chat_request.lat, chat_request.lng, chat_request.radius_km)
+    candidates = select(models.Opportunity).options(opportunity_response_fields)
+    if near is not None:
+        candidates = candidates.filter(near)
+    await vector_search.use_ef_search(db, limit=HYBRID_CANDIDATES_PER_LIST, filtered=near is not None)
+    similar_opportunities = (await db.execute(
+        hybrid_search(candidates, chat_request.message, query_embedding, limit=3)
+    )).scalars().all()
 
     if not similar_opportunities:
         return {"reply": "I couldn't find any opportunities in our database that match your request. Please try rephrasing your search."}
@@ -504,13 +874,10 @@ def recommend_opportunities(chat_request: schemas.ChatRequest, db: Session = Dep
     
     try:
         model = genai.GenerativeModel(GEMINI_CHAT_MODEL_NAME)
-        response = model.generate_content(prompt)
+        response = await gemini_client.call_async(model.generate_content_async, prompt)
         ai_reply = response.text
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error generating AI response: {str(e)}"
-        )
+        raise gemini_http_error(e, "Error generating AI response")
 
     return {"reply": ai_reply}
 
@@ -532,118 +899,305 @@ class AIFilterResponse(BaseModel):
 # --- END: Define the AI's JSON output structure ---
 
 
-@app.post("/api/chat", response_model=schemas.ChatResponse)
-def handle_chat(chat_request: schemas.ChatRequest, db: Session = Depends(get_db)):
-    user_message = chat_request.message
-    
-    # 1. INTENT DETECTION (Same as before)
-    intent_prompt = f"""
+def _intent_prompt(user_message: str) -> str:
+    return f"""
     Analyze the user's message and classify its intent.
     Respond with only one word: 'OPPORTUNITY' if the user is asking to find a job, role, or opportunity.
     Otherwise, respond with 'QUESTION'.
 
     User message: "{user_message}"
     """
+
+
+async def detect_intent_with_gemini(user_message: str) -> str:
+    """Asks Gemini to classify the message. Used only when the local classifiers are unsure."""
+    intent_model = genai.GenerativeModel(GEMINI_CHAT_MODEL_NAME)
+    return (await gemini_client.call_async(intent_model.generate_content_async, _intent_prompt(user_message))).text
+
+
+centroid_intent_classifier = intent.CentroidIntentClassifier(generate_embedding, async_embed=generate_embedding_async)
+intent_pipeline = intent.IntentPipeline(
+    [intent.KeywordIntentClassifier(), centroid_intent_classifier],
+    fallback=detect_intent_with_gemini,
+    threshold=INTENT_CONFIDENCE_THRESHOLD,
+)
+
+
+background_tasks = set()
+
+
+@app.on_event("startup")
+def warm_intent_centroids():
+    # Embed the labelled examples in the background so the first chat doesn't pay for it
+    threading.Thread(target=centroid_intent_classifier.centroids, daemon=True).start()
+
+
+@app.on_event("startup")
+def build_knowledge_base():
+    # Embeds only new or changed chunks, in the background so startup isn't delayed
+    def build():
+        try:
+            with SessionLocal() as db:
+                print(f"Knowledge base: {knowledge_base.build_index(db, embed_texts)}")
+        except Exception as e:
+            print(f"Knowledge base: index build failed ({e})")
+    if GEMINI_API_KEY and GEMINI_EMBED_MODEL_NAME:
+        threading.Thread(target=build, daemon=True).start()
+
+
+@app.on_event("startup")
+async def purge_stale_answers():
+    # Cached answers generated from previous knowledge base documents are no longer valid.
+    # In the background: startup must not wait on the database.
+    async def purge():
+        try:
+            async with AsyncSessionLocal() as db:
+                purged = await answer_cache.purge_stale(db)
+            if purged:
+                print(f"Answer cache: purged {purged} answers from an older context")
+        except Exception as e:
+            print(f"Answer cache: could not purge stale answers ({e})")
+    task = asyncio.create_task(purge())
+    # Keep a reference until it finishes, or the task may be garbage collected
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+@app.on_event("shutdown")
+async def close_scraping_client():
+    await scraping.close_client()
+
+
+@app.on_event("shutdown")
+async def close_geocoding_client():
+    await geocoding.close_client()
+
+
+NO_MATCH_REPLY = "I couldn't find any opportunities in our database that match your request. Please try rephrasing your search."
+
+
+async def find_chat_opportunities(user_message: str, embedding_task: asyncio.Task, db: AsyncSession, near=None):
+    """The OPPORTUNITY branch of the chat: vector retrieval, then the Gemini ID filter.
+
+    `near` is an optional geo.radius_filter condition on the candidates.
+    Returns (reply, opportunities). Raises HTTPException like the endpoint always has.
+    """
+    # 1. Retrieve: Get the top potential matches (vector and full-text rankings fused)
+    query_embedding = await require_query_embedding(embedding_task)
+
+    candidates = select(models.Opportunity).options(opportunity_response_fields)
+    if near is not None:
+        candidates = candidates.filter(near)
+    await vector_search.use_ef_search(db, limit=HYBRID_CANDIDATES_PER_LIST, filtered=near is not None)
+    similar_opportunities = (await db.execute(
+        hybrid_search(candidates, user_message, query_embedding, limit=CHAT_FILTER_CANDIDATES)
+    )).scalars().all()
+
+    if not similar_opportunities:
+        return NO_MATCH_REPLY, None
+
+    # 2. Filter: Use the AI to review the candidates and return ONLY IDs
+    opportunity_context = ""
+    for opp in similar_opportunities:
+        # Provide all info for the AI to make a good decision
+        opportunity_context += f"ID: {opp.id}\nTitle: {opp.title}\nDescription: {opp.description}\nTags: {', '.join(opp.tags)}\n---\n"
+
+    filter_prompt = f"""
+    You are a smart career assistant. A user is looking for a job.
+    Their request is: "{user_message}"
+
+    I have found {len(similar_opportunities)} potential matches from the database. Your job is to:
+    1.  Carefully review each job in the "Database Context" below.
+    2.  Compare each job's title, description, and tags to the user's request.
+    3.  Create a new, filtered list containing ONLY the IDs of the jobs that are TRULY relevant.
     
-    try:
-        intent_model = genai.GenerativeModel(GEMINI_CHAT_MODEL_NAME)
-        intent_response = intent_model.generate_content(intent_prompt)
-        intent = intent_response.text.strip().upper()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error detecting intent: {str(e)}")
+    **CRITICAL RULE:** If the user asks for 'C++' or 'Swift', you MUST DISCARD a job that only lists 'Python'. Only include exact or very close skill matches.
+    
+    Finally, provide a response in the required JSON format.
+    - The 'reply' should be a single, friendly introduction.
+    - The 'relevant_ids' list should contain ONLY the IDs of the relevant jobs you selected.
+    - If NO jobs are relevant, return an empty 'relevant_ids' list and a 'reply' saying you couldn't find a match.
 
-    # 2. ACTION: Based on the intent
+    Database Context:
+    {opportunity_context}
+    """
     
-    # --- THIS IS THE NEW, ROBUST LOGIC ---
-    if "OPPORTUNITY" in intent:
-        # 1. Retrieve: Get top 10 potential matches
-        query_embedding = generate_embedding(user_message)
-        if not query_embedding:
-            raise HTTPException(status_code=500, detail="Could not generate query embedding.")
-
-        similar_opportunities = db.query(models.Opportunity).order_by(
-            models.Opportunity.embedding.cosine_distance(query_embedding)
-        ).limit(10).all()
-
-        if not similar_opportunities:
-            return {"reply": "I couldn't find any opportunities in our database that match your request. Please try rephrasing your search."}
-
-        # 2. Filter: Use the AI to review the candidates and return ONLY IDs
-        opportunity_context = ""
-        for opp in similar_opportunities:
-            # Provide all info for the AI to make a good decision
-            opportunity_context += f"ID: {opp.id}\nTitle: {opp.title}\nDescription: {opp.description}\nTags: {', '.join(opp.tags)}\n---\n"
-
-        filter_prompt = f"""
-        You are a smart career assistant. A user is looking for a job.
-        Their request is: "{user_message}"
-
-        I have found 10 potential matches from the database. Your job is to:
-        1.  Carefully review each job in the "Database Context" below.
-        2.  Compare each job's title, description, and tags to the user's request.
-        3.  Create a new, filtered list containing ONLY the IDs of the jobs that are TRULY relevant.
-        
-        **CRITICAL RULE:** If the user asks for 'C++' or 'Swift', you MUST DISCARD a job that only lists 'Python'. Only include exact or very close skill matches.
+    try:
+        filter_model = genai.GenerativeModel(
+            GEMINI_CHAT_MODEL_NAME,
+            generation_config={"response_mime_type": "application/json"}
+        )
+        ai_json_response = (await gemini_client.call_async(
+            filter_model.generate_content_async,
+            [filter_prompt],
+            generation_config={"response_schema": AIFilterResponse}
+        )).text
         
-        Finally, provide a response in the required JSON format.
-        - The 'reply' should be a single, friendly introduction.
-        - The 'relevant_ids' list should contain ONLY the IDs of the relevant jobs you selected.
-        - If NO jobs are relevant, return an empty 'relevant_ids' list and a 'reply' saying you couldn't find a match.
-
-        Database Context:
-        {opportunity_context}
-        """
+        ai_data = json.loads(ai_json_response)
         
-        try:
-            filter_model = genai.GenerativeModel(
-                GEMINI_CHAT_MODEL_NAME,
-                generation_config={"response_mime_type": "application/json"}
-            )
-            ai_json_response = filter_model.generate_content(
-                [filter_prompt],
-                generation_config={"response_schema": AIFilterResponse}
-            ).text
-            
-            ai_data = json.loads(ai_json_response)
-            
-            ai_reply = ai_data.get("reply", "Here's what I found:")
-            relevant_ids = ai_data.get("relevant_ids", [])
-
-            # 3. Database Fetch: Use the safe IDs to get full, valid objects
-            final_opportunities = []
-            if relevant_ids:
-                final_opportunities = db.query(models.Opportunity).filter(
-                    models.Opportunity.id.in_(relevant_ids)
-                ).all()
-
-            # This response is guaranteed to match your schemas.ChatResponse
-            return {"reply": ai_reply, "opportunities": final_opportunities}
-            
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error filtering AI response: {str(e)}")
-
-    # --- END OF NEW LOGIC ---
-
-    # If the user is asking a general question, use the fixed context
-    else: 
-        general_qa_prompt = f"""
-        You are GOPHORA AI, a helpful assistant. Answer the user's question using ONLY the provided context.
-        ---CONTEXT---
-        {context.WEBSITE_CONTEXT}
-        ---END CONTEXT---
-        User's Question: "{user_message}"
-        Answer:
-        """
+        ai_reply = ai_data.get("reply", "Here's what I found:")
+        relevant_ids = ai_data.get("relevant_ids", [])
+
+        # 3. Database Fetch: Use the safe IDs to get full, valid objects
+        final_opportunities = []
+        if relevant_ids:
+            final_opportunities = (await db.execute(
+                select(models.Opportunity).options(opportunity_response_fields).filter(models.Opportunity.id.in_(relevant_ids))
+            )).scalars().all()
+
+        return ai_reply, final_opportunities
         
-        try:
-            response_model = genai.GenerativeModel(GEMINI_CHAT_MODEL_NAME)
-            final_response = response_model.generate_content(general_qa_prompt)
-            ai_reply = final_response.text
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error generating final AI response: {str(e)}")
+    except Exception as e:
+        raise gemini_http_error(e, "Error filtering AI response")
+
+
+def general_question_prompt(user_message: str, kb_context: Optional[str] = None) -> str:
+    return f"""
+    You are GOPHORA AI, a helpful assistant. Answer the user's question using ONLY the provided context.
+    ---CONTEXT---
+    {kb_context or context.WEBSITE_CONTEXT}
+    ---END CONTEXT---
+    User's Question: "{user_message}"
+    Answer:
+    """
+
+
+async def detect_chat_intent(user_message: str) -> tuple[intent.IntentDecision, asyncio.Task]:
+    """Runs the intent stage and returns the decision with the (already started) embedding task."""
+    # Start embedding the message right away: the opportunity branch needs it, and
+    # the call overlaps with intent detection instead of following it.
+    embedding_task = asyncio.create_task(generate_embedding_async(user_message))
+
+    # Local classifiers first, Gemini only when they are unsure
+    decision = await intent_pipeline.aclassify(user_message)
+    print(f"handle_chat: intent={decision.intent} source={decision.source} confidence={decision.confidence:.2f}")
+    return decision, embedding_task
+
+
+async def lookup_cached_answer(embedding_task: asyncio.Task, db: AsyncSession):
+    """Returns (question embedding, cached answer or None) for the QUESTION branch."""
+    try:
+        question_embedding = await embedding_task
+    except gemini_client.GeminiBusy as e:
+        raise gemini_http_error(e, "Error generating final AI response")
+    return question_embedding, await answer_cache.lookup(db, question_embedding)
+
+
+async def general_question_prompt_for(user_message: str, question_embedding, db: AsyncSession) -> str:
+    # Only the knowledge base chunks relevant to the question go into the prompt;
+    # the whole WEBSITE_CONTEXT is the fallback when the index is unavailable.
+    kb_context = await knowledge_base.retrieve(db, question_embedding)
+    return general_question_prompt(user_message, kb_context)
+
+
+@app.post("/api/chat", response_model=schemas.ChatResponse)
+async def handle_chat(chat_request: schemas.ChatRequest, db: AsyncSession = Depends(get_async_db)):
+    user_message = chat_request.message
 
-        # Return with an empty list for opportunities
-        return {"reply": ai_reply, "opportunities": []}
+    # 1. INTENT DETECTION
+    decision, embedding_task = await detect_chat_intent(user_message)
+
+    # 2. ACTION: Based on the intent
+    if decision.intent == intent.OPPORTUNITY:
+        near = geo.radius_filter(chat_request.lat, chat_request.lng, chat_request.radius_km)
+        ai_reply, final_opportunities = await find_chat_opportunities(user_message, embedding_task, db, near)
+        if final_opportunities is None:
+            return {"reply": ai_reply}
+        # This response is guaranteed to match your schemas.ChatResponse
+        return {"reply": ai_reply, "opportunities": final_opportunities}
+
+    # If the user is asking a general question, use the fixed context.
+    # Semantically equivalent questions were answered before: reuse that answer.
+    question_embedding, cached_reply = await lookup_cached_answer(embedding_task, db)
+    if cached_reply is not None:
+        return {"reply": cached_reply, "opportunities": []}
+
+    prompt = await general_question_prompt_for(user_message, question_embedding, db)
+    try:
+        response_model = genai.GenerativeModel(GEMINI_CHAT_MODEL_NAME)
+        final_response = await gemini_client.call_async(response_model.generate_content_async, prompt)
+        ai_reply = final_response.text
+    except Exception as e:
+        raise gemini_http_error(e, "Error generating final AI response")
+
+    await answer_cache.store(db, user_message, question_embedding, ai_reply)
+
+    # Return with an empty list for opportunities
+    return {"reply": ai_reply, "opportunities": []}
+
+
+def sse_event(event: str, data) -> str:
+    """Formats one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def handle_chat_stream(chat_request: schemas.ChatRequest):
+    """
+    Streaming variant of /api/chat using Server-Sent Events.
+
+    Events, in order:
+      - `intent`:        {"intent", "source"} as soon as the intent is known
+      - `opportunities`: {"opportunities": [...]} as soon as the ID filter resolves (OPPORTUNITY only)
+      - `token`:         {"text"} reply fragments, streamed from Gemini as they are produced
+      - `done`:          {"reply", "intent", "opportunity_count", "cached", "elapsed_ms"} summary
+      - `error`:         {"detail"} if a stage fails; the stream ends after it
+    """
+    user_message = chat_request.message
+
+    async def events():
+        started = time.perf_counter()
+        reply = ""
+        opportunities = []
+        cached = False
+        # The session is owned by the generator, since it outlives the endpoint function
+        async with AsyncSessionLocal() as db:
+            try:
+                decision, embedding_task = await detect_chat_intent(user_message)
+                yield sse_event("intent", {"intent": decision.intent, "source": decision.source})
+
+                if decision.intent == intent.OPPORTUNITY:
+                    near = geo.radius_filter(chat_request.lat, chat_request.lng, chat_request.radius_km)
+                    reply, found = await find_chat_opportunities(user_message, embedding_task, db, near)
+                    opportunities = found or []
+                    yield sse_event("opportunities", {
+                        "opportunities": [schemas.Opportunity.model_validate(opp) for opp in opportunities]
+                    })
+                    # The reply arrives with the filter's JSON, so it is a single fragment
+                    yield sse_event("token", {"text": reply})
+                else:
+                    question_embedding, cached_reply = await lookup_cached_answer(embedding_task, db)
+                    if cached_reply is not None:
+                        cached = True
+                        reply = cached_reply
+                        yield sse_event("token", {"text": reply})
+                    else:
+                        prompt = await general_question_prompt_for(user_message, question_embedding, db)
+                        response_model = genai.GenerativeModel(GEMINI_CHAT_MODEL_NAME)
+                        async for chunk in gemini_client.stream_async(response_model.generate_content_async, prompt, stream=True):
+                            if chunk.text:
+                                reply += chunk.text
+                                yield sse_event("token", {"text": chunk.text})
+                        await answer_cache.store(db, user_message, question_embedding, reply)
+
+                yield sse_event("done", {
+                    "reply": reply,
+                    "intent": decision.intent,
+                    "opportunity_count": len(opportunities),
+                    "cached": cached,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000),
+                })
+            except HTTPException as e:
+                yield sse_event("error", {"detail": e.detail})
+            except Exception as e:
+                yield sse_event("error", {"detail": gemini_http_error(e, "Error generating final AI response").detail})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop proxies (e.g. nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
     
 # Duplicate recommend endpoint removed. Kept the original `/api/opportunities/recommend`
 # defined earlier in this file (placed before the dynamic `/api/opportunities/{opportunity_id}` route)
@@ -651,30 +1205,34 @@ def handle_chat(chat_request: schemas.ChatRequest, db: Session = Depends(get_db)
 # In main.py, update your existing /api/verification/verify endpoint
 
 @app.post("/api/verification/verify", response_model=schemas.VerificationResponse)
-def verify_provider(
+async def verify_provider(
     request_data: schemas.VerificationRequest,
-    current_user: models.User = Depends(auth.get_current_active_provider),
-    db: Session = Depends(get_db)
+    current_user: schemas.Principal = Depends(auth.get_current_active_provider),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Receives provider data, scrapes URL content, sends it to Gemini for analysis,
     and returns a Trust Score.
     """
-    # 1. Scrape content from URLs to get more context
-    scraped_content = ""
+    # 1. Scrape content from URLs to get more context (concurrently, within one deadline,
+    # from the 24h scrape cache when possible; see scraping.py)
+    sources = []
     if request_data.website_url:
-        scraped_content += f"\n\n--- Scraped Content from Website ({request_data.website_url}) ---\n"
-        scraped_content += scrape_url_content(request_data.website_url)
+        sources.append(("Website", request_data.website_url))
 
     if request_data.portfolio_url:
-        scraped_content += f"\n\n--- Scraped Content from Portfolio ({request_data.portfolio_url}) ---\n"
-        scraped_content += scrape_url_content(request_data.portfolio_url)
+        sources.append(("Portfolio", request_data.portfolio_url))
 
     if request_data.social_profiles:
         for profile in request_data.social_profiles:
             if profile.url:
-                 scraped_content += f"\n\n--- Scraped Content from Social Profile ({profile.url}) ---\n"
-                 scraped_content += scrape_url_content(profile.url)
+                sources.append(("Social Profile", profile.url))
+
+    pages = await scraping.scrape_urls(db, [url for _, url in sources])
+    scraped_content = ""
+    for (label, url), page in zip(sources, pages):
+        scraped_content += f"\n\n--- Scraped Content from {label} ({url}) ---\n"
+        scraped_content += page
 
     # 2. Prepare data and the NEW prompt for Gemini
     provider_data_json = request_data.model_dump_json(indent=2)
@@ -701,7 +1259,8 @@ def verify_provider(
     try:
         # 3. Call Gemini API
         model = genai.GenerativeModel(GEMINI_CHAT_MODEL_NAME)
-        response = model.generate_content(prompt)
+        # Verification can wait: chat and recommendations go first
+        response = await gemini_client.call_async(model.generate_content_async, prompt, priority=gemini_client.BACKGROUND)
         
         print(f"DEBUG: Gemini verification response: {response.text}")
 
@@ -716,22 +1275,24 @@ def verify_provider(
         trust_score = ai_result.get("trust_score", 0)
         recommendation = ai_result.get("recommendation", "review")
 
-        profile = db.query(models.Profile).filter(models.Profile.user_id == current_user.id).first()
+        profile = (await db.execute(
+            select(models.Profile).filter(models.Profile.user_id == current_user.id)
+        )).scalars().first()
         if profile:
             profile.trust_score = trust_score
             profile.verification_status = recommendation
-            db.commit()
+            await db.commit()
 
         return ai_result
 
     except Exception as e:
         print(f"Error during verification: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to get a valid response from the AI verification service: {str(e)}")
+        raise gemini_http_error(e, "Failed to get a valid response from the AI verification service")
 
 
 @app.get("/api/verification/status")
 def get_verification_status(
-    current_user: models.User = Depends(auth.get_current_user),
+    current_user: schemas.User = Depends(auth.get_current_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -745,36 +1306,3 @@ def get_verification_status(
         "trust_score": profile.trust_score,
         "verification_status": profile.verification_status
     }
-
-# ... (the rest of your main.py file, like /api/auth/register)
-import requests
-from bs4 import BeautifulSoup
-
-def scrape_url_content(url: str) -> str:
-    """
-    Visits a URL, scrapes its text content, and returns a summary.
-    This acts as our 'searching engine'.
-    """
-    if not url or not url.startswith(('http://', 'https://')):
-        return "No valid URL provided."
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status() # Raise an exception for bad status codes
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script and style elements
-        for script_or_style in soup(["script", "style"]):
-            script_or_style.decompose()
-
-        # Get text and clean it up
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        # Return the first 500 characters for brevity
-        return text[:500] + "..." if len(text) > 500 else text
-    except requests.RequestException as e:
-        return f"Could not access URL: {e}"
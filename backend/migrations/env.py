@@ -0,0 +1,49 @@
+"""
+This file is the Alembic environment: it runs the revisions in migrations/versions
+against DATABASE_URL. Schema changes are applied here, as an explicit deployment
+step, and never when the app is imported or started.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool, text
+
+from backend import models
+from backend.database import SQLALCHEMY_DATABASE_URL
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# Lets `alembic revision --autogenerate` compare the models with the database
+target_metadata = models.Base.metadata
+
+
+def run_migrations_offline():
+    """Prints the SQL instead of running it (`alembic upgrade head --sql`)."""
+    context.configure(
+        url=SQLALCHEMY_DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # A one-off connection without the app's pool or statement_timeout:
+    # backfills and index builds can take a while on big tables
+    connectable = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        connection.execute(text("SET statement_timeout = 0"))
+        connection.commit()
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,102 @@
+"""initial schema
+
+The tables as `models.Base.metadata.create_all` used to create them at startup.
+Every statement is IF NOT EXISTS, so databases created that way upgrade in place.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String()),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_users_id", "users", ["id"], if_not_exists=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True, if_not_exists=True)
+
+    op.create_table(
+        "profiles",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True),
+        sa.Column("avatar_url", sa.Text()),
+        sa.Column("bio", sa.Text()),
+        sa.Column("skills", postgresql.ARRAY(sa.Text())),
+        sa.Column("interests", postgresql.ARRAY(sa.Text())),
+        sa.Column("company_name", sa.String()),
+        sa.Column("company_website", sa.Text()),
+        sa.Column("country", sa.String()),
+        sa.Column("city", sa.String()),
+        sa.Column("trust_score", sa.Integer()),
+        sa.Column("verification_status", sa.String()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_profiles_id", "profiles", ["id"], if_not_exists=True)
+
+    op.create_table(
+        "opportunities",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("provider_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("type", sa.String()),
+        sa.Column("location", sa.String()),
+        sa.Column("lat", sa.Float()),
+        sa.Column("lng", sa.Float()),
+        sa.Column("tags", postgresql.ARRAY(sa.Text())),
+        sa.Column("status", sa.String()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("embedding", Vector(768)),
+        if_not_exists=True,
+    )
+    op.create_index("ix_opportunities_id", "opportunities", ["id"], if_not_exists=True)
+
+    op.create_table(
+        "applications",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("seeker_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("opportunity_id", sa.Integer(), sa.ForeignKey("opportunities.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("status", sa.String()),
+        sa.Column("cover_letter", sa.Text()),
+        sa.Column("submitted_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_applications_id", "applications", ["id"], if_not_exists=True)
+
+    op.create_table(
+        "subscriptions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True),
+        sa.Column("plan_name", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("start_date", sa.DateTime(timezone=True)),
+        sa.Column("end_date", sa.DateTime(timezone=True)),
+        if_not_exists=True,
+    )
+    op.create_index("ix_subscriptions_id", "subscriptions", ["id"], if_not_exists=True)
+
+
+def downgrade():
+    for table in ("subscriptions", "applications", "opportunities", "profiles", "users"):
+        op.drop_table(table)
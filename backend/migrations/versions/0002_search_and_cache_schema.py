@@ -0,0 +1,143 @@
+"""search indexes, embeddings and cache tables
+
+Everything added on top of the initial schema for retrieval and caching: the
+answer/knowledge-base/checkpoint tables, profile embeddings, tag_keys and the
+full-text search_vector, and the indexes behind pagination, tag overlap, full-text,
+HNSW vector, radius and dashboard queries. Like 0001 it is IF NOT EXISTS throughout,
+for databases that got these from the old startup patches.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.dialects import postgresql
+
+from backend.config import HNSW_EF_CONSTRUCTION, HNSW_M
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# Copied rather than imported from models, so this revision doesn't change if the model does
+OPPORTUNITY_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(array_to_tsvector(coalesce(tag_keys, '{}')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade():
+    op.create_table(
+        "answer_cache",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("question", sa.Text(), nullable=False),
+        sa.Column("answer", sa.Text(), nullable=False),
+        sa.Column("context_hash", sa.String(64), nullable=False),
+        sa.Column("embedding", Vector(768), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True,
+    )
+    op.create_index("ix_answer_cache_id", "answer_cache", ["id"], if_not_exists=True)
+    op.create_index("ix_answer_cache_context_hash", "answer_cache", ["context_hash"], if_not_exists=True)
+
+    op.create_table(
+        "kb_chunks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("token_count", sa.Integer(), nullable=False),
+        sa.Column("embedding", Vector(768), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index("ix_kb_chunks_id", "kb_chunks", ["id"], if_not_exists=True)
+    op.create_index("ix_kb_chunks_content_hash", "kb_chunks", ["content_hash"], unique=True, if_not_exists=True)
+
+    op.create_table(
+        "job_checkpoints",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        if_not_exists=True,
+    )
+
+    op.add_column("profiles", sa.Column("embedding", Vector(768)), if_not_exists=True)
+    op.add_column("profiles", sa.Column("embedding_hash", sa.String(64)), if_not_exists=True)
+
+    op.add_column("opportunities", sa.Column("tag_keys", postgresql.ARRAY(sa.Text())), if_not_exists=True)
+    # Fill tag_keys for existing rows (see models.normalize_tags)
+    op.execute(
+        "UPDATE opportunities SET tag_keys = ARRAY(SELECT DISTINCT lower(btrim(t)) FROM unnest(tags) AS t "
+        "WHERE btrim(t) <> '' ORDER BY 1) WHERE tag_keys IS NULL AND tags IS NOT NULL"
+    )
+    # After tag_keys, which it is computed from
+    op.add_column(
+        "opportunities",
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(OPPORTUNITY_SEARCH_VECTOR, persisted=True)),
+        if_not_exists=True,
+    )
+
+    # Keyset pagination and the listing filters
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"], if_not_exists=True)
+    op.create_index("ix_opportunities_created_at_id", "opportunities", ["created_at", "id"], if_not_exists=True)
+    for name, column in (("provider", "provider_id"), ("status", "status"), ("type", "type"), ("location", "location")):
+        op.create_index(
+            f"ix_opportunities_{name}_created_at_id", "opportunities", [column, "created_at", "id"], if_not_exists=True
+        )
+
+    op.create_index(
+        "ix_opportunities_tag_keys_gin", "opportunities", ["tag_keys"], postgresql_using="gin", if_not_exists=True
+    )
+    op.create_index(
+        "ix_opportunities_search_vector_gin", "opportunities", ["search_vector"], postgresql_using="gin", if_not_exists=True
+    )
+    op.create_index(
+        "ix_opportunities_embedding_hnsw",
+        "opportunities",
+        ["embedding"],
+        postgresql_using="hnsw",
+        postgresql_with={"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION},
+        postgresql_ops={"embedding": "vector_cosine_ops"},
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_opportunities_geo_point_gist",
+        "opportunities",
+        [sa.text("point(lng, lat)")],
+        postgresql_using="gist",
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_applications_opportunity_id_status",
+        "applications",
+        ["opportunity_id", "status"],
+        postgresql_include=["submitted_at"],
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    for index, table in (
+        ("ix_applications_opportunity_id_status", "applications"),
+        ("ix_opportunities_geo_point_gist", "opportunities"),
+        ("ix_opportunities_embedding_hnsw", "opportunities"),
+        ("ix_opportunities_search_vector_gin", "opportunities"),
+        ("ix_opportunities_tag_keys_gin", "opportunities"),
+        ("ix_opportunities_location_created_at_id", "opportunities"),
+        ("ix_opportunities_type_created_at_id", "opportunities"),
+        ("ix_opportunities_status_created_at_id", "opportunities"),
+        ("ix_opportunities_provider_created_at_id", "opportunities"),
+        ("ix_opportunities_created_at_id", "opportunities"),
+        ("ix_users_created_at_id", "users"),
+    ):
+        op.drop_index(index, table_name=table)
+    op.drop_column("opportunities", "search_vector")
+    op.drop_column("opportunities", "tag_keys")
+    op.drop_column("profiles", "embedding_hash")
+    op.drop_column("profiles", "embedding")
+    for table in ("job_checkpoints", "kb_chunks", "answer_cache"):
+        op.drop_table(table)
@@ -0,0 +1,30 @@
+"""one application per seeker and opportunity
+
+Removes duplicate applications (keeping the earliest of each pair) and adds the
+unique constraint that apply_for_opportunity's ON CONFLICT DO NOTHING relies on.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Possible before this constraint: two concurrent applies could both pass the existence check
+    op.execute(
+        "DELETE FROM applications a USING applications b "
+        "WHERE a.seeker_id = b.seeker_id AND a.opportunity_id = b.opportunity_id AND a.id > b.id"
+    )
+    op.create_unique_constraint(
+        "uq_applications_seeker_id_opportunity_id", "applications", ["seeker_id", "opportunity_id"]
+    )
+
+
+def downgrade():
+    op.drop_constraint("uq_applications_seeker_id_opportunity_id", "applications", type_="unique")
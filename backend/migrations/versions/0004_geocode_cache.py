@@ -0,0 +1,29 @@
+"""geocode cache
+
+Geoapify results by normalized location text, including misses (see geocoding.py).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "geocode_cache",
+        sa.Column("location_key", sa.Text(), primary_key=True),
+        sa.Column("lat", sa.Float()),
+        sa.Column("lng", sa.Float()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("geocode_cache")
@@ -0,0 +1,31 @@
+"""scrape cache
+
+Text extracted from provider URLs for verification, with the ETag/Last-Modified
+validators needed to revalidate it (see scraping.py).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "scrape_cache",
+        sa.Column("url", sa.Text(), primary_key=True),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("etag", sa.Text()),
+        sa.Column("last_modified", sa.Text()),
+        sa.Column("fetched_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("scrape_cache")
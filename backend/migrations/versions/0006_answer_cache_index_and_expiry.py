@@ -0,0 +1,35 @@
+"""answer cache index and expiry
+
+HNSW index on answer_cache.embedding for the nearest-question lookup, and an index
+on created_at for expiring old answers (see answer_cache.py).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+from backend.config import HNSW_EF_CONSTRUCTION, HNSW_M
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_answer_cache_embedding_hnsw",
+        "answer_cache",
+        ["embedding"],
+        postgresql_using="hnsw",
+        postgresql_with={"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION},
+        postgresql_ops={"embedding": "vector_cosine_ops"},
+        if_not_exists=True,
+    )
+    op.create_index("ix_answer_cache_created_at", "answer_cache", ["created_at"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_answer_cache_created_at", table_name="answer_cache")
+    op.drop_index("ix_answer_cache_embedding_hnsw", table_name="answer_cache")
@@ -0,0 +1,57 @@
+"""tokenize tags in the search vector
+
+0002 put the tags into opportunities.search_vector as whole, unstemmed lexemes
+(array_to_tsvector), which plainto_tsquery's stemmed single words never match for
+multi-word tags ("machine learning") or tags whose stem differs ("databases"). The
+tags now go through to_tsvector('english', ...) like the title, via an IMMUTABLE
+wrapper around array_to_string so the column can stay generated.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# Copied rather than imported from models, so this revision doesn't change if the model does
+OPPORTUNITY_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', opportunity_tags_text(tag_keys)), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+PREVIOUS_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(array_to_tsvector(coalesce(tag_keys, '{}')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def _replace_search_vector(expression: str):
+    # A generated column's expression can't be altered: drop it and add it back (rows are recomputed)
+    op.drop_index("ix_opportunities_search_vector_gin", table_name="opportunities", if_exists=True)
+    op.drop_column("opportunities", "search_vector")
+    op.add_column(
+        "opportunities",
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(expression, persisted=True)),
+    )
+    op.create_index("ix_opportunities_search_vector_gin", "opportunities", ["search_vector"], postgresql_using="gin")
+
+
+def upgrade():
+    # array_to_string is only STABLE; joining text with spaces is immutable in practice
+    op.execute(
+        "CREATE OR REPLACE FUNCTION opportunity_tags_text(tags text[]) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ SELECT coalesce(array_to_string(tags, ' '), '') $$"
+    )
+    _replace_search_vector(OPPORTUNITY_SEARCH_VECTOR)
+
+
+def downgrade():
+    _replace_search_vector(PREVIOUS_SEARCH_VECTOR)
+    op.execute("DROP FUNCTION IF EXISTS opportunity_tags_text(text[])")
@@ -8,11 +8,29 @@ Database Creation: Use SQLAlchemy's engine to create all tables in your local Po
 This file defines the database models for the application using SQLAlchemy's ORM.
 Each class in this file corresponds to a table in the database.
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, func, Boolean, Float
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import Column, Computed, Integer, String, DateTime, ForeignKey, Text, func, Boolean, Float, Index, UniqueConstraint
+from sqlalchemy.orm import deferred, relationship, validates
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from .database import Base
 from pgvector.sqlalchemy import Vector
+from .config import HNSW_M, HNSW_EF_CONSTRUCTION
+
+# Full-text document of an opportunity: title and tags weigh more than the description.
+# The (normalized) tags are tokenized and stemmed like the title, so "machine learning" and
+# "databases" match queries the way plainto_tsquery words them. Generated columns need
+# immutable expressions, which rules out array_to_string itself; opportunity_tags_text
+# (migration 0007) is an IMMUTABLE wrapper around it.
+OPPORTUNITY_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', opportunity_tags_text(tag_keys)), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+def normalize_tags(tags):
+    """Lowercased, stripped, de-duplicated tags, as stored in Opportunity.tag_keys."""
+    if tags is None:
+        return None
+    return sorted({tag.strip().lower() for tag in tags if tag and tag.strip()})
 
 # Represents the 'users' table in the database.
 # SQLAlchemy's ORM maps this class to the table, and its attributes to the columns.
@@ -33,6 +51,11 @@ class User(Base):
     applications = relationship("Application", back_populates="seeker")
     subscription = relationship("Subscription", back_populates="user", uselist=False)
 
+    __table_args__ = (
+        # Keyset pagination (see pagination.py)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
 class Profile(Base):
     __tablename__ = "profiles"
 
@@ -48,6 +71,11 @@ class Profile(Base):
     city = Column(String)
     trust_score = Column(Integer)
     verification_status = Column(String)
+    # Embedding of the seeker's skills/interests/bio, used for recommendations.
+    # embedding_hash is the hash of the text it was computed from, so it's only recomputed on change.
+    # Deferred: only loaded by queries that ask for it (see get_recommendations_for_seeker).
+    embedding = deferred(Column(Vector(768), nullable=True))
+    embedding_hash = Column(String(64), nullable=True)
     user = relationship("User", back_populates="profile")
 
 class Opportunity(Base):
@@ -62,12 +90,47 @@ class Opportunity(Base):
     lat = Column(Float)
     lng = Column(Float)
     tags = Column(ARRAY(Text))
+    # Lowercased, de-duplicated copy of `tags` for matching (GIN indexed); kept in sync by `_sync_tag_keys`
+    tag_keys = Column(ARRAY(Text))
     status = Column(String, default="open") # CHECK (status IN ('open', 'closed', 'completed'))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
     provider = relationship("User", back_populates="opportunities")
     applications = relationship("Application", back_populates="opportunity")
-    embedding = Column(Vector(768), nullable=True)
+    # Both deferred: they are only used inside SQL (ORDER BY / WHERE), never sent to clients,
+    # and a 768-float vector is most of the row.
+    embedding = deferred(Column(Vector(768), nullable=True))
+    # Maintained by Postgres from title/tags/description; see hybrid_search.py
+    search_vector = deferred(Column(TSVECTOR, Computed(OPPORTUNITY_SEARCH_VECTOR, persisted=True)))
+
+    __table_args__ = (
+        # Keyset pagination (see pagination.py) and the listing filters
+        Index("ix_opportunities_created_at_id", "created_at", "id"),
+        Index("ix_opportunities_provider_created_at_id", "provider_id", "created_at", "id"),
+        Index("ix_opportunities_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_opportunities_type_created_at_id", "type", "created_at", "id"),
+        Index("ix_opportunities_location_created_at_id", "location", "created_at", "id"),
+        # Tag overlap (`tag_keys && :tags`) for the tag filter and the recommendation fallback
+        Index("ix_opportunities_tag_keys_gin", "tag_keys", postgresql_using="gin"),
+        # Full-text matching (`search_vector @@ :tsquery`) in the hybrid search
+        Index("ix_opportunities_search_vector_gin", "search_vector", postgresql_using="gin"),
+        # Approximate nearest neighbour index for the `embedding <=> :q` searches
+        Index(
+            "ix_opportunities_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
+
+    @validates("tags")
+    def _sync_tag_keys(self, key, tags):
+        self.tag_keys = normalize_tags(tags)
+        return tags
+
+# Bounding-box prefilter of the radius searches (`point(lng, lat) <@ box`, see geo.py)
+Index("ix_opportunities_geo_point_gist", func.point(Opportunity.lng, Opportunity.lat), postgresql_using="gist")
 
 class Application(Base):
     __tablename__ = "applications"
@@ -81,6 +144,15 @@ class Application(Base):
     seeker = relationship("User", back_populates="applications")
     opportunity = relationship("Opportunity", back_populates="applications")
 
+    __table_args__ = (
+        # Per-opportunity counts by status for the provider dashboard (/api/opportunities/me/summary);
+        # submitted_at is included so the summary is an index-only scan
+        Index("ix_applications_opportunity_id_status", "opportunity_id", "status", postgresql_include=["submitted_at"]),
+        # One application per seeker and opportunity; apply_for_opportunity relies on it
+        # (ON CONFLICT DO NOTHING) instead of checking first, which two concurrent clicks could both pass
+        UniqueConstraint("seeker_id", "opportunity_id", name="uq_applications_seeker_id_opportunity_id"),
+    )
+
 class Subscription(Base):
     __tablename__ = "subscriptions"
 
@@ -90,4 +162,67 @@ class Subscription(Base):
     status = Column(String, nullable=False) # CHECK (status IN ('active', 'canceled', 'past_due'))
     start_date = Column(DateTime(timezone=True))
     end_date = Column(DateTime(timezone=True))
-    user = relationship("User", back_populates="subscription")
\ No newline at end of file
+    user = relationship("User", back_populates="subscription")
+
+class AnswerCache(Base):
+    __tablename__ = "answer_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    question = Column(Text, nullable=False)
+    answer = Column(Text, nullable=False)
+    # Hash of the context the answer was generated from; answers from an older context are ignored
+    context_hash = Column(String(64), index=True, nullable=False)
+    embedding = deferred(Column(Vector(768), nullable=False))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Nearest-question lookup (see answer_cache.py), so it doesn't scan the whole table
+        Index(
+            "ix_answer_cache_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        # Expiry of old answers
+        Index("ix_answer_cache_created_at", "created_at"),
+    )
+
+class KnowledgeChunk(Base):
+    __tablename__ = "kb_chunks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    content_hash = Column(String(64), unique=True, index=True, nullable=False)
+    token_count = Column(Integer, nullable=False)
+    embedding = deferred(Column(Vector(768), nullable=False))
+
+class GeocodeCache(Base):
+    __tablename__ = "geocode_cache"
+
+    # Location text as normalized by geocoding.location_key ("  Berlin " -> "berlin")
+    location_key = Column(Text, primary_key=True)
+    # Both NULL: Geoapify found nothing (a cached miss, retried once it expires)
+    lat = Column(Float)
+    lng = Column(Float)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class ScrapeCache(Base):
+    __tablename__ = "scrape_cache"
+
+    # Text extracted from a page for provider verification (see scraping.py)
+    url = Column(Text, primary_key=True)
+    content = Column(Text, nullable=False)
+    # Validators for conditional GETs once the entry is older than SCRAPE_CACHE_TTL_SECONDS
+    etag = Column(Text)
+    last_modified = Column(Text)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class JobCheckpoint(Base):
+    __tablename__ = "job_checkpoints"
+
+    # One row per resumable background job (e.g. 'opportunity_embeddings')
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
@@ -0,0 +1,64 @@
+"""
+This file implements keyset (cursor) pagination for the listing endpoints.
+
+Pages are ordered newest first by (created_at, id). The cursor is an opaque token
+encoding the (created_at, id) of the last row of the previous page, so fetching the
+next page is an index range scan no matter how deep the client pages, unlike OFFSET.
+
+To keep existing clients working, listing endpoints still return a plain JSON list;
+the cursor for the next page is sent in the `X-Next-Cursor` response header and is
+absent on the last page.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query, model, page: PageParams, response: Response):
+    """Applies keyset pagination on (created_at, id) to a query over `model`.
+
+    Returns one page of rows and sets the X-Next-Cursor header if there are more.
+    """
+    if page.cursor:
+        created_at, row_id = decode_cursor(page.cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return rows
@@ -0,0 +1,126 @@
+"""
+This file runs password hashing and verification (Argon2) on a dedicated, bounded pool.
+
+Argon2 is deliberately slow and memory-hard. Run on the request threads, a burst of
+logins used every thread FastAPI has and stalled unrelated endpoints. Here it runs on
+PASSWORD_HASH_WORKERS threads of its own (argon2-cffi releases the GIL while hashing),
+so at most that many hashes use CPU at once. Beyond PASSWORD_HASH_MAX_QUEUE waiting jobs,
+new ones are refused with a 503 instead of queueing without bound.
+
+The Argon2 parameters come from config.py (ARGON2_*). Hashes made with other parameters
+still verify, and `verify_and_update` returns a new hash for them so login can store it.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .config import (
+    ARGON2_MEMORY_COST_KIB,
+    ARGON2_PARALLELISM,
+    ARGON2_TIME_COST,
+    PASSWORD_HASH_MAX_QUEUE,
+    PASSWORD_HASH_WORKERS,
+)
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST_KIB,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+
+class PasswordHashPool:
+    """A fixed-size thread pool for password work, with a queue limit and counters."""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _admit(self):
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many sign-ins at once, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.queued += 1
+
+    def _run(self, submitted: float, fn, args):
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            waited = started - submitted
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.total_run_seconds += time.perf_counter() - started
+
+    def run(self, fn, *args):
+        """Runs `fn(*args)` on the pool and blocks the calling thread until it's done."""
+        self._admit()
+        return self._executor.submit(self._run, time.perf_counter(), fn, args).result()
+
+    async def run_async(self, fn, *args):
+        """Runs `fn(*args)` on the pool without blocking the event loop."""
+        self._admit()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._run, time.perf_counter(), fn, args
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queued,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_ms_mean": round(self.total_wait_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+                "wait_ms_max": round(self.max_wait_seconds * 1000, 3),
+                "hash_ms_mean": round(self.total_run_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+
+pool = PasswordHashPool(workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_MAX_QUEUE)
+
+
+def hash_password(password: str) -> str:
+    return pool.run(pwd_context.hash, password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await pool.run_async(pwd_context.hash, password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return pool.run(pwd_context.verify, password, hashed)
+
+
+async def verify_and_update(password: str, hashed: str) -> tuple[bool, Optional[str]]:
+    """(matches, new hash or None): a new hash when `hashed` used other Argon2 parameters."""
+    return await pool.run_async(pwd_context.verify_and_update, password, hashed)
@@ -0,0 +1,93 @@
+"""
+This file provides the in-process cache of authenticated users used by auth.py.
+
+Every authenticated request used to load its user by email. Now the access token
+carries the user id, the role guards trust the token's id and role, and requests that
+need the whole user (get_current_user) are served a snapshot from this cache for a
+short TTL. Entries are dropped when the user row changes (see the listeners in auth.py),
+and when the role changes or the user is deleted, tokens issued before that point stop
+being trusted on their own and are checked against the database again.
+
+The cache is per worker: a change made through another worker reaches this one when the
+entry expires (AUTH_PRINCIPAL_CACHE_TTL_SECONDS), or for the role guards when the token
+expires (ACCESS_TOKEN_EXPIRE_MINUTES).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class PrincipalCache:
+    """An LRU + TTL cache of user snapshots keyed by user id, plus per-user token revocations."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60, revocation_seconds: float = 30 * 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # How long a revocation is remembered: tokens older than this have expired anyway
+        self.revocation_seconds = revocation_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[int, tuple[float, object]]" = OrderedDict()
+        self._revoked_before: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                stored_at, user = entry
+                if time.time() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return user
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def set(self, user_id: int, user):
+        with self._lock:
+            self._entries[user_id] = (time.time(), user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int, revoke_tokens: bool = False):
+        """Drops the user's entry; with `revoke_tokens`, tokens issued until now must be re-checked."""
+        now = time.time()
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self.invalidations += 1
+            if revoke_tokens:
+                self._revoked_before[user_id] = now
+                # Forget revocations that no unexpired token can predate
+                for revoked_id, revoked_at in list(self._revoked_before.items()):
+                    if now - revoked_at > self.revocation_seconds:
+                        del self._revoked_before[revoked_id]
+
+    def is_revoked(self, user_id: int, issued_at: Optional[float]) -> bool:
+        """Whether a token for `user_id` issued at `issued_at` predates a revocation."""
+        with self._lock:
+            revoked_at = self._revoked_before.get(user_id)
+        # Tokens without iat can't be placed in time, so any revocation applies to them
+        return revoked_at is not None and (issued_at is None or issued_at <= revoked_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._revoked_before.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "revoked_users": len(self._revoked_before),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
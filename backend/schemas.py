@@ -9,10 +9,12 @@ These schemas are used by FastAPI for data validation, serialization, and docume
 They define the shape of the data for API requests and responses, and are separate
 from the SQLAlchemy database models.
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import List, Optional
 
+from .geo import MAX_RADIUS_KM
+
 # A base schema for a User, containing common attributes.
 # Other schemas inherit from this to avoid repetition.
 class UserBase(BaseModel):
@@ -47,6 +49,15 @@ class User(UserBase):
         # This allows the Pydantic model to read data from ORM models (like SQLAlchemy).
         from_attributes = True
 
+# Who made a request, as far as the role guards need to know (see auth.py)
+class Principal(BaseModel):
+    id: int
+    email: str
+    role: str
+
+    class Config:
+        from_attributes = True
+
 # Schema for the response when a user successfully logs in.
 class Token(BaseModel):
     access_token: str
@@ -109,6 +120,17 @@ class Opportunity(OpportunityBase):
     class Config:
         from_attributes = True # Use this instead of orm_mode for Pydantic V2
 
+class NearbyOpportunity(Opportunity):
+    distance_km: float
+
+# One row of the provider dashboard: the opportunity plus its application counts
+class OpportunitySummary(Opportunity):
+    application_count: int = 0
+    pending_count: int = 0
+    accepted_count: int = 0
+    rejected_count: int = 0
+    latest_application_at: Optional[datetime] = None
+
 class ApplicationBase(BaseModel):
     status: Optional[str] = "pending"
     cover_letter: Optional[str] = None
@@ -147,6 +169,10 @@ class Subscription(SubscriptionBase):
 
 class ChatRequest(BaseModel):
     message: str
+    # Optional "near me" constraint: only opportunities within radius_km of (lat, lng)
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lng: Optional[float] = Field(None, ge=-180, le=180)
+    radius_km: Optional[float] = Field(None, gt=0, le=MAX_RADIUS_KM)
 
 class ChatResponse(BaseModel):
     reply: str
@@ -0,0 +1,296 @@
+"""
+This file scrapes the URLs a provider submits for verification (website, portfolio,
+social profiles) into short text summaries for the Gemini prompt.
+
+All URLs of one verification are fetched concurrently over a shared, pooled HTTP
+client, each with SCRAPE_TIMEOUT_SECONDS and all together within
+SCRAPE_DEADLINE_SECONDS; a URL still loading at the deadline is reported as
+unreachable rather than holding up the verification. Extracted text is kept in
+`scrape_cache` for SCRAPE_CACHE_TTL_SECONDS (24 hours, as the spec asks). After that
+the page is revalidated with If-None-Match / If-Modified-Since, and a 304 reuses the
+cached text without downloading or parsing the page again.
+
+Pages are streamed, not loaded whole: anything that isn't HTML is turned away on its
+Content-Type, at most SCRAPE_MAX_BYTES are read, and the body is fed chunk by chunk to
+`PageTextExtractor`, which keeps no document tree and stops once it has the 500
+characters the summary needs; the rest of the page is never downloaded.
+"""
+import asyncio
+import codecs
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from html.parser import HTMLParser
+from typing import Optional
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import (
+    SCRAPE_CACHE_TTL_SECONDS,
+    SCRAPE_DEADLINE_SECONDS,
+    SCRAPE_MAX_BYTES,
+    SCRAPE_MAX_CONNECTIONS,
+    SCRAPE_TIMEOUT_SECONDS,
+)
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+SUMMARY_CHARS = 500
+# Bytes handed to the parser at a time (it runs in a worker thread, one hop per batch)
+_PARSE_BATCH_BYTES = 64 * 1024
+
+# cache_hits / revalidated (304) / fetched (200) / not_html / truncated / errors /
+# deadline_exceeded, for /api/admin/metrics
+stats = Counter()
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """The shared client, so connections (and TLS sessions) are reused between verifications."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    # A client is bound to the event loop it was first used on
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=SCRAPE_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=SCRAPE_MAX_CONNECTIONS),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+class PageTextExtractor(HTMLParser):
+    """Collects the visible text of an HTML document fed in pieces, until it has `limit` characters.
+
+    The text is the same as BeautifulSoup's get_text() cleaned the way this file always
+    did (script/style dropped, lines and double-space separated phrases stripped, one
+    per line), but it is built as the tokenizer goes, so no tree is kept and `done`
+    turns True as soon as more input can't change the summary.
+    """
+
+    def __init__(self, limit: int = SUMMARY_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.done = False
+        self._chunks: list[str] = []
+        self._length = 0  # len("\n".join(self._chunks))
+        self._node: list[str] = []
+        self._line: list[str] = []
+        self._line_length = 0
+        self._line_checked = 0
+        self._skip = 0
+        self._preserve = 0
+
+    def handle_starttag(self, tag, attrs):
+        self._end_node()
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag in ("pre", "textarea"):
+            self._preserve += 1
+
+    def handle_endtag(self, tag):
+        self._end_node()
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+        elif tag in ("pre", "textarea") and self._preserve:
+            self._preserve -= 1
+
+    def handle_comment(self, data):
+        self._end_node()
+
+    def handle_decl(self, decl):
+        self._end_node()
+
+    def handle_pi(self, data):
+        self._end_node()
+
+    def handle_data(self, data):
+        # One text node can arrive in several pieces when the input is fed in chunks
+        self._node.append(data)
+
+    def _end_node(self):
+        text, self._node = "".join(self._node), []
+        if not text or self._skip or self.done:
+            return
+        # Like BeautifulSoup, whitespace between tags counts as one space (or newline)
+        if not self._preserve and not text.strip(" \n\t\f\r"):
+            text = "\n" if "\n" in text else " "
+        for part in text.splitlines(keepends=True):
+            lines = part.splitlines()
+            line = lines[0] if lines else ""
+            self._line.append(line)
+            self._line_length += len(line)
+            if len(line) != len(part):
+                self._end_line()
+            if self.done:
+                return
+        # Minified pages can be one long line; once it alone is long enough, stop there
+        if self._line_length - self._line_checked > self.limit:
+            self._line_checked = self._line_length
+            if self._length + len(self._clean("".join(self._line))) > self.limit:
+                self._end_line()
+
+    @staticmethod
+    def _clean(line: str) -> str:
+        return "\n".join(phrase.strip() for phrase in line.strip().split("  ") if phrase.strip())
+
+    def _end_line(self):
+        for phrase in self._clean("".join(self._line)).split("\n"):
+            if phrase:
+                self._length += len(phrase) + (1 if self._chunks else 0)
+                self._chunks.append(phrase)
+        self._line, self._line_length, self._line_checked = [], 0, 0
+        if self._length > self.limit:
+            self.done = True
+
+    def feed(self, data: str):
+        if not self.done:
+            super().feed(data)
+
+    def summary(self) -> str:
+        """The first `limit` characters of text, with "..." if there was more."""
+        if not self.done:
+            self.close()
+            self._end_node()
+            self._end_line()
+        text = "\n".join(self._chunks)
+        return text[:self.limit] + "..." if len(text) > self.limit else text
+
+
+def extract_page_text(html: str) -> str:
+    """Returns the first 500 characters of visible text in an HTML document."""
+    extractor = PageTextExtractor()
+    for i in range(0, len(html), _PARSE_BATCH_BYTES):
+        extractor.feed(html[i:i + _PARSE_BATCH_BYTES])
+        if extractor.done:
+            break
+    return extractor.summary()
+
+
+def _media_type(response: httpx.Response) -> str:
+    return response.headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+def _is_fresh(entry: models.ScrapeCache) -> bool:
+    return datetime.now(timezone.utc) - entry.fetched_at <= timedelta(seconds=SCRAPE_CACHE_TTL_SECONDS)
+
+
+async def _fetch(client: httpx.AsyncClient, url: str, cached: Optional[models.ScrapeCache]) -> tuple[str, Optional[dict]]:
+    """(text for the prompt, cache row to store or None)."""
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    try:
+        async with client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached is not None:
+                stats["revalidated"] += 1
+                return cached.content, {"url": url, "content": cached.content, "etag": cached.etag, "last_modified": cached.last_modified}
+            response.raise_for_status() # Raise an exception for bad status codes
+            # No Content-Type at all is given the benefit of the doubt
+            media_type = _media_type(response)
+            if media_type and media_type not in HTML_CONTENT_TYPES:
+                stats["not_html"] += 1
+                return f"Could not read URL: not an HTML page ({media_type})", None
+
+            extractor = PageTextExtractor()
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+            pending, received = [], 0
+            # Tokenizing is CPU-bound, so batches of the body are parsed in a thread
+            async for chunk in response.aiter_bytes():
+                chunk = chunk[:SCRAPE_MAX_BYTES - received]
+                received += len(chunk)
+                pending.append(chunk)
+                if received >= SCRAPE_MAX_BYTES:
+                    stats["truncated"] += 1
+                    break
+                if sum(map(len, pending)) >= _PARSE_BATCH_BYTES:
+                    await asyncio.to_thread(extractor.feed, decoder.decode(b"".join(pending)))
+                    pending = []
+                    if extractor.done:
+                        break
+            content = await asyncio.to_thread(_finish, extractor, decoder.decode(b"".join(pending), final=True))
+    except httpx.HTTPError as e:
+        stats["errors"] += 1
+        return f"Could not access URL: {e}", None
+
+    stats["fetched"] += 1
+    return content, {
+        "url": url,
+        "content": content,
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+    }
+
+
+def _finish(extractor: PageTextExtractor, text: str) -> str:
+    extractor.feed(text)
+    return extractor.summary()
+
+
+async def scrape_urls(db: AsyncSession, urls: list[str]) -> list[str]:
+    """The text summary of each URL (or why there is none), in the order given."""
+    started = time.monotonic()
+    results: dict[str, str] = {}
+    valid = list(dict.fromkeys(url for url in urls if url and url.startswith(('http://', 'https://'))))
+
+    cached = {}
+    if valid:
+        entries = (await db.execute(select(models.ScrapeCache).where(models.ScrapeCache.url.in_(valid)))).scalars().all()
+        cached = {entry.url: entry for entry in entries}
+    for url in valid:
+        if url in cached and _is_fresh(cached[url]):
+            stats["cache_hits"] += 1
+            results[url] = cached[url].content
+
+    client = get_client()
+    tasks = {
+        asyncio.create_task(_fetch(client, url, cached.get(url))): url
+        for url in valid if url not in results
+    }
+    rows = []
+    if tasks:
+        remaining = max(0.0, SCRAPE_DEADLINE_SECONDS - (time.monotonic() - started))
+        done, pending = await asyncio.wait(tasks, timeout=remaining)
+        for task in pending:
+            task.cancel()
+            stats["deadline_exceeded"] += 1
+            results[tasks[task]] = f"Could not access URL: no response within {SCRAPE_DEADLINE_SECONDS:g}s"
+        for task in done:
+            content, row = task.result()
+            results[tasks[task]] = content
+            if row is not None:
+                rows.append(row)
+
+    if rows:
+        statement = pg_insert(models.ScrapeCache).values(rows)
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[models.ScrapeCache.url],
+            set_={
+                "content": statement.excluded.content,
+                "etag": statement.excluded.etag,
+                "last_modified": statement.excluded.last_modified,
+                "fetched_at": func.now(),
+            },
+        ))
+        await db.commit()
+
+    return [results.get(url, "No valid URL provided.") for url in urls]
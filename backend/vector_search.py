@@ -0,0 +1,26 @@
+"""
+This file holds helpers for the pgvector searches over `opportunities.embedding`.
+
+The column has an HNSW index (see models.Opportunity), which makes `ORDER BY
+embedding <=> :q LIMIT k` an approximate search. `hnsw.ef_search` is the size of the
+candidate list the index keeps while searching: higher means better recall and
+slower queries. An index scan never returns more than ef_search rows, and rows
+removed by a WHERE clause are removed from those, so filtered searches need a
+larger value than their LIMIT.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import HNSW_EF_SEARCH
+
+
+def ef_search_statement(limit: int = 0, filtered: bool = False, ef_search: int = HNSW_EF_SEARCH):
+    # Filters discard candidates after the index scan, so over-fetch for them
+    wanted = limit * 5 if filtered else limit
+    # SET does not take bind parameters; the value is always an int
+    return text(f"SET LOCAL hnsw.ef_search = {max(int(ef_search), int(wanted))}")
+
+
+async def use_ef_search(db: AsyncSession, limit: int = 0, filtered: bool = False, ef_search: int = HNSW_EF_SEARCH):
+    """Sets hnsw.ef_search for the current transaction, before a vector search."""
+    await db.execute(ef_search_statement(limit, filtered, ef_search))
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
-import { APIURL } from "../../services/api.js";
+import { fetchPage } from "../../services/api.js";
 
 export default function Opportunities() {
   const navigate = useNavigate();
@@ -8,6 +8,8 @@ export default function Opportunities() {
   const [opportunities, setOpportunities] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Dummy fallback data
   const dummyOpportunities = [
@@ -37,11 +39,8 @@ export default function Opportunities() {
   useEffect(() => {
     const fetchOpportunities = async () => {
       try {
-        const response = await fetch(`${APIURL}/api/opportunities`);
-        if (!response.ok) {
-          throw new Error("Network response was not ok");
-        }
-        const data = await response.json();
+        const { items: data, nextCursor } = await fetchPage("/api/opportunities");
+        setNextCursor(nextCursor);
 
         // ✅ If backend returns no opportunities, use dummy ones
         if (!data || data.length === 0) {
@@ -62,6 +61,21 @@ export default function Opportunities() {
     fetchOpportunities();
   }, []);
 
+  // Appends the next page of opportunities (the listing is paginated)
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const { items, nextCursor: cursor } = await fetchPage("/api/opportunities", { cursor: nextCursor });
+      setOpportunities((current) => [...current, ...items]);
+      setNextCursor(cursor);
+    } catch (err) {
+      console.error("Error fetching more opportunities:", err);
+      setError(err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (loading) {
     return (
       <div className="bg-[#0A0F2C] text-white text-center py-40">
@@ -132,6 +146,20 @@ export default function Opportunities() {
         )}
       </div>
 
+      {nextCursor && (
+        <div className="relative z-[2] text-center mt-10">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className={`border border-[#A28EFF]/40 hover:bg-[#A28EFF]/10 text-[#A28EFF] font-medium px-6 py-2.5 rounded-lg transition-all text-sm ${
+              loadingMore ? "opacity-60 cursor-not-allowed" : ""
+            }`}
+          >
+            {loadingMore ? "Loading..." : "Load More Opportunities"}
+          </button>
+        </div>
+      )}
+
       <div className="relative z-[2] text-center mt-12">
         <button
           onClick={() => navigate("/login")}
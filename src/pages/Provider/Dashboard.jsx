@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from "react";
 import { Briefcase, Users, Activity, ShieldCheck, AlertTriangle } from "lucide-react";
 import { useNavigate } from "react-router-dom";
-import { APIURL } from '../../services/api.js'
+import { APIURL, fetchAllPages } from '../../services/api.js'
 
 export default function ProviderDashboard() {
   const navigate = useNavigate();
@@ -23,30 +23,17 @@ export default function ProviderDashboard() {
         const token = localStorage.getItem("token");
         if (!token) throw new Error("Authentication token not found.");
 
-        // Fetch opportunities stats
-        const oppsRes = await fetch(`${APIURL}/api/opportunities/me`, {
+        // Fetch opportunities stats: the summary carries each opportunity's application
+        // counts, so no request per opportunity is needed
+        const opportunities = await fetchAllPages("/api/opportunities/me/summary", {
           headers: { Authorization: `Bearer ${token}` },
-        });
-
-        if (oppsRes.ok) {
-          const opportunities = await oppsRes.json();
-          let totalApplications = 0;
-
-          for (const opportunity of opportunities) {
-            const appsRes = await fetch(
-              `${APIURL}/api/opportunities/${opportunity.id}/applications`,
-              { headers: { Authorization: `Bearer ${token}` } }
-            );
-            if (appsRes.ok) {
-              const applications = await appsRes.json();
-              totalApplications += applications.length;
-            }
-          }
+        }).catch(() => null);
 
+        if (opportunities) {
           setStats({
             totalOpportunities: opportunities.length,
             activeListings: opportunities.filter((op) => op.status === "open").length,
-            applicationsReceived: totalApplications,
+            applicationsReceived: opportunities.reduce((total, op) => total + op.application_count, 0),
           });
         }
 
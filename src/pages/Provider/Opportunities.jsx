@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from "react";
 import { ChevronDown } from "lucide-react";
 import OpportunityForm from "../../components/forms/OpportunityForm";
-import { APIURL } from '../../services/api.js'
+import { APIURL, fetchAllPages } from '../../services/api.js'
 
 export default function Opportunities() {
   const [opportunities, setOpportunities] = useState([]);
@@ -13,11 +13,10 @@ export default function Opportunities() {
   const fetchOpportunities = async () => {
     try {
       const token = localStorage.getItem("token");
-      const response = await fetch(`${APIURL}/api/opportunities/me`, {
+      // Every page: filtering and search happen on the full list below
+      const data = await fetchAllPages("/api/opportunities/me", {
         headers: { Authorization: `Bearer ${token}` },
       });
-      if (!response.ok) throw new Error("Failed to fetch opportunities");
-      const data = await response.json();
       setOpportunities(data);
     } catch (err) {
       setError(err.message);
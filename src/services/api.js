@@ -1 +1,29 @@
 export const APIURL = "https://gophora-backend.onrender.com";
+
+// Listing endpoints return one page at a time; the next page's cursor comes in this header
+export const NEXT_CURSOR_HEADER = "X-Next-Cursor";
+
+// Fetches one page of a listing endpoint. Returns { items, nextCursor } (nextCursor is null on the last page).
+export async function fetchPage(path, { cursor, limit, ...options } = {}) {
+  const url = new URL(`${APIURL}${path}`);
+  if (cursor) url.searchParams.set("cursor", cursor);
+  if (limit) url.searchParams.set("limit", limit);
+  const response = await fetch(url, options);
+  if (!response.ok) throw new Error(`Request to ${path} failed (${response.status})`);
+  return {
+    items: await response.json(),
+    nextCursor: response.headers.get(NEXT_CURSOR_HEADER),
+  };
+}
+
+// Fetches every page of a listing endpoint by following the cursor, and returns all items.
+export async function fetchAllPages(path, options = {}) {
+  const items = [];
+  let cursor = null;
+  do {
+    const page = await fetchPage(path, { ...options, cursor, limit: 100 });
+    items.push(...page.items);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return items;
+}